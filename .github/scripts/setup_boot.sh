@@ -22,3 +22,9 @@ echo "pi:$(echo 'raspberry' | openssl passwd -6 -stdin)" | sudo tee /boot/userco
 # Enable SSH
 ssh-keygen -A &&
 update-rc.d ssh enable
+
+# Let Go Note Go talk to redis over a local unix socket rather than TCP.
+sudo sed -i \
+    -e 's|^# *unixsocket .*|unixsocket /run/redis/redis-server.sock|' \
+    -e 's|^# *unixsocketperm .*|unixsocketperm 777|' \
+    /etc/redis/redis.conf
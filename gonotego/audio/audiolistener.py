@@ -1,23 +1,58 @@
+from typing import Optional, Text
+
+import dataclasses
 import os
 import subprocess
+import threading
+import time
 
 import numpy as np
 import sounddevice as sd
 import soundfile as sf
 
+from gonotego.audio import segments
+from gonotego.audio import vad
 from gonotego.common import status
 from gonotego.leds import indicators
+from gonotego.settings import settings
 
 Status = status.Status
 
-SILENCE_THRESHOLD = 0.10
-
-
-def get_max_volume(samples):
-  return np.max(np.abs(samples))
 
-
-def set_audio_recording_status(recording):
+@dataclasses.dataclass
+class AudioFormat:
+  extension: Text
+  format: Text
+  subtype: Optional[Text]
+  samplerate: int
+
+
+# The formats recordings can be captured in, selected by the AUDIO_FORMAT setting.
+# FLAC and Opus are encoded while recording at a sample rate suited to speech,
+# which makes the files much smaller to upload than 44.1 kHz WAV.
+AUDIO_FORMATS = {
+    'wav': AudioFormat(extension='wav', format='WAV', subtype=None, samplerate=44100),
+    'flac': AudioFormat(extension='flac', format='FLAC', subtype='PCM_16', samplerate=16000),
+    'opus': AudioFormat(extension='ogg', format='OGG', subtype='OPUS', samplerate=16000),
+}
+DEFAULT_AUDIO_FORMAT = 'wav'
+MAX_SAMPLERATE = 48000
+# Frames per PortAudio callback, and per block of voice activity detection.
+BLOCKSIZE = 1024
+# How much audio the ring buffer can hold while the writer thread is stalled (e.g. on the SD card).
+RING_BUFFER_SECONDS = 10
+WRITER_POLL_SECONDS = 0.02
+
+
+def get_audio_format():
+  audio_format = settings.get_or_default('AUDIO_FORMAT', DEFAULT_AUDIO_FORMAT)
+  if audio_format.lower() not in AUDIO_FORMATS:
+    print(f'Unexpected AUDIO_FORMAT {audio_format}. Using {DEFAULT_AUDIO_FORMAT}.')
+    audio_format = DEFAULT_AUDIO_FORMAT
+  return AUDIO_FORMATS[audio_format.lower()]
+
+
+def set_audio_recording_status(recording, beep=True):
   # Navigate up two directories from the current file location
   base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
   beep_hi_path = os.path.join(base_path, 'assets', 'beep_hi.wav')
@@ -26,81 +61,176 @@ def set_audio_recording_status(recording):
   status.set(Status.AUDIO_RECORDING, recording)
   if recording:
     indicators.set(state=1)
-    if status.get(Status.VOLUME_SETTING) != 'off':
+    if beep:
       subprocess.call(['aplay', beep_hi_path])
 
   else:
     indicators.set(state=0)
-    if status.get(Status.VOLUME_SETTING) != 'off':
+    if beep:
       subprocess.call(['aplay', beep_lo_path])
 
 
+class RingBuffer:
+  """A preallocated single-producer, single-consumer ring buffer of audio frames.
+
+  The producer only advances write_count and the consumer only advances read_count, so
+  neither side needs a lock. The producer publishes frames by advancing write_count
+  after copying them in, and the consumer frees space by advancing read_count after
+  copying them out.
+  """
+
+  def __init__(self, capacity, channels, dtype='float32'):
+    self.buffer = np.zeros((capacity, channels), dtype=dtype)
+    self.capacity = capacity
+    self.write_count = 0
+    self.read_count = 0
+
+  def write(self, frames):
+    """Copies frames into the buffer. Returns the number of frames dropped for lack of space."""
+    free = self.capacity - (self.write_count - self.read_count)
+    dropped = max(0, len(frames) - free)
+    if dropped:
+      frames = frames[:free]
+    n = len(frames)
+    start = self.write_count % self.capacity
+    first = min(n, self.capacity - start)
+    self.buffer[start:start + first] = frames[:first]
+    self.buffer[:n - first] = frames[first:]
+    self.write_count += n
+    return dropped
+
+  def read(self, max_frames):
+    """Copies out and removes up to max_frames frames from the buffer."""
+    n = min(max_frames, self.write_count - self.read_count)
+    start = self.read_count % self.capacity
+    first = min(n, self.capacity - start)
+    frames = np.concatenate((self.buffer[start:start + first], self.buffer[:n - first]))
+    self.read_count += n
+    return frames
+
+  def available(self):
+    return self.write_count - self.read_count
+
+
 class AudioListener:
 
   def __init__(self):
-    self.samplerate = sd.default.samplerate = 44100
+    self.samplerate = AUDIO_FORMATS[DEFAULT_AUDIO_FORMAT].samplerate
     self.channels = sd.default.channels = 1
 
     self.recording = False
+    # Whether to beep as the current recording starts and stops. VOLUME_SETTING is read
+    # once per recording rather than once per beep.
+    self.beep = True
     self.stream = None
     self.file = None
-
-  def record(self, filepath):
+    self.writer = None
+    self.segment_writer = None
+    self.ring_buffer = RingBuffer(int(RING_BUFFER_SECONDS * MAX_SAMPLERATE), self.channels)
+
+    # Counts since the listener was created, published to status when a recording stops.
+    # Overflows count callbacks where audio was lost, either because PortAudio reported
+    # an input overflow or because the ring buffer was full. Underruns count callbacks
+    # where PortAudio reported an input underflow.
+    self.overflows = 0
+    self.underruns = 0
+
+  def record(self, filepath, audio_format=None, on_segment=None):
+    """Records to filepath, which should have the extension of audio_format.
+
+    Args:
+      filepath: The path to record to.
+      audio_format: The AudioFormat to record in. Defaults to WAV.
+      on_segment: If set, the speech is also written to segment files while recording,
+        and on_segment is called with the path of each. See segments.py.
+    """
+    audio_format = audio_format or AUDIO_FORMATS[DEFAULT_AUDIO_FORMAT]
+    # Discard any frames left over from the last recording. No writer is running, so
+    # this side of the ring buffer is free to move.
+    self.ring_buffer.read_count = self.ring_buffer.write_count
     self.recording = True
-    set_audio_recording_status(self.recording)
+    self.beep = status.get(Status.VOLUME_SETTING) != 'off'
+    set_audio_recording_status(self.recording, self.beep)
 
+    self.samplerate = audio_format.samplerate
     self.file = sf.SoundFile(
         filepath,
         mode='x',  # 'x' raises an error if the file already exists.
         samplerate=self.samplerate,
         channels=self.channels,
-        # subtype='PCM_24',
+        format=audio_format.format,
+        subtype=audio_format.subtype,
     )
 
     # Keep track of how much silence there is to allow for early stopping.
-    self.max_volume = 0.001
-    self.consecutive_loud = 0
-    self.consecutive_quiet = 0
-    self.consecutive_loud_frames = 0
-    self.consecutive_quiet_frames = 0
-
-    def record_callback(indata, frames, time, status):
-      frame_max_volume = get_max_volume(indata)
-      if frame_max_volume / self.max_volume > SILENCE_THRESHOLD:
-        # Loud frame.
-        self.consecutive_loud += 1
-        self.consecutive_loud_frames += frames
-        if self.consecutive_loud > 20:
-          self.consecutive_quiet = 0
-          self.consecutive_quiet_frames = 0
-      else:
-        # Quiet frame.
-        self.consecutive_quiet += 1
-        self.consecutive_quiet_frames += frames
-        if self.consecutive_quiet > 20:
-          self.consecutive_loud = 0
-          self.consecutive_loud_frames = 0
-
-      self.max_volume = max(self.max_volume, frame_max_volume)
-      self.file.write(indata.copy())
+    self.vad = vad.VoiceActivityDetector(self.samplerate)
+    if on_segment is not None:
+      self.segment_writer = segments.SegmentWriter(filepath, self.samplerate, on_segment)
+
+    def record_callback(indata, frames, time, flags):
+      # This runs on PortAudio's realtime thread, so it only copies the audio into the
+      # ring buffer. Analysis and disk writes happen on the writer thread.
+      if flags.input_overflow:
+        self.overflows += 1
+      if flags.input_underflow:
+        self.underruns += 1
+      if self.ring_buffer.write(indata):
+        self.overflows += 1
+
+    self.writer = threading.Thread(target=self.write_loop, daemon=True)
+    self.writer.start()
 
     assert self.stream is None
     try:
-      self.stream = sd.InputStream(callback=record_callback)
+      self.stream = sd.InputStream(
+          samplerate=self.samplerate, callback=record_callback, blocksize=BLOCKSIZE)
       self.stream.start()
     except sd.PortAudioError:
       self.stream = None
       self.recording = False
-      set_audio_recording_status(self.recording)
+      self.writer.join()
+      self.writer = None
+      self.segment_writer = None
+      self.file.close()
+      set_audio_recording_status(self.recording, self.beep)
+
+  def write_loop(self):
+    """Drains the ring buffer to the file until recording stops and the buffer is empty."""
+    while self.recording or self.ring_buffer.available():
+      if self.ring_buffer.available() < BLOCKSIZE and self.recording:
+        time.sleep(WRITER_POLL_SECONDS)
+        continue
+      block = self.ring_buffer.read(BLOCKSIZE)
+      closed_segments = self.vad.process(block)
+      self.file.write(block)
+      if self.segment_writer is not None:
+        self.segment_writer.add(block, closed_segments)
 
   def silence_length(self):
-    return self.consecutive_quiet_frames / self.samplerate
+    return self.vad.silence_length()
 
-  def stop(self):
-    self.recording = False
-    set_audio_recording_status(self.recording)
+  def stop(self, cancel=False):
+    """Stops recording.
+
+    Args:
+      cancel: Whether the recording is being discarded, in which case its last segment
+        is not written.
+    """
+    # Stop the stream first, so that no more frames arrive (e.g. the beep below) once the
+    # writer has drained the ring buffer.
     self.stream.stop()
     self.stream.close()
+    self.recording = False
+    set_audio_recording_status(self.recording, self.beep)
+    # The writer finishes draining the ring buffer once recording is False.
+    self.writer.join()
+    self.writer = None
     self.file.flush()
     self.file.close()
     self.stream = None
+    if self.segment_writer is not None:
+      if not cancel:
+        self.segment_writer.flush(self.vad.open_segment())
+      self.segment_writer = None
+    status.set(Status.AUDIO_OVERFLOWS, self.overflows)
+    status.set(Status.AUDIO_UNDERRUNS, self.underruns)
@@ -1,27 +1,62 @@
 from absl import logging
 
 from datetime import datetime
+import os
 import subprocess
 import time
 
+import sounddevice as sd
+import soundfile as sf
+
 from gonotego.audio import audiolistener
+from gonotego.audio import segments
 from gonotego.audio import trigger
 from gonotego.common import events
 from gonotego.common import interprocess
+from gonotego.common import journal
 from gonotego.common import status
 
 Status = status.Status
 
+# How often to check for silence while recording.
+SILENCE_CHECK_SECONDS = 0.1
+# How long the trigger must be held down to cancel and read back.
+HOLD_SECONDS = 1
+
 
-def make_filepath():
+def make_filepath(extension='wav'):
   now = datetime.now()
   date_str = now.strftime('%Y%m%d')
   milliseconds = int(round(time.time() * 1000))
-  return f'out/{date_str}-{milliseconds}.wav'
+  return f'out/{date_str}-{milliseconds}.{extension}'
+
+
+def play(filepath):
+  if filepath.endswith('.wav'):
+    subprocess.call(['aplay', filepath])
+  else:
+    # aplay only plays uncompressed audio, so decode FLAC and Opus with soundfile.
+    data, samplerate = sf.read(filepath, dtype='float32')
+    sd.play(data, samplerate)
+    sd.wait()
+
+
+def enqueue_recording(audio_events_queue, note_events_queue, filepath):
+  # The placeholder note is uploaded right away, in the order it was recorded,
+  # and updated once the recording is transcribed.
+  note_event = events.NoteEvent(
+      text=f'[Transcribing {os.path.basename(filepath)}]',
+      action=events.AUDIO_PLACEHOLDER,
+      audio_filepath=filepath,
+      timestamp=time.time(),
+  )
+  journal.put_many([note_events_queue], [bytes(note_event)])
+  event = events.AudioEvent(events.AUDIO_DONE, filepath)
+  audio_events_queue.put(bytes(event))
 
 
-def enqueue_recording(queue, filepath):
-  event = events.AudioEvent(events.AUDIO_DONE, filepath)
+def enqueue_segment(queue, filepath):
+  event = events.AudioEvent(events.AUDIO_SEGMENT, filepath)
   queue.put(bytes(event))
 
 
@@ -30,29 +65,44 @@ def main():
   print('Starting audio listener.')
   listener = audiolistener.AudioListener()
   audio_events_queue = interprocess.get_audio_events_queue()
+  note_events_queue = interprocess.get_note_events_queue()
   status.set(Status.AUDIO_READY, True)
 
   filepath = None
   last_filepath = None
-  last_pressed = False
+  pressed = False
   last_press_time = None
   hold_triggered = False
   press_time = None
 
+  audio_trigger = trigger.Trigger()
+  audio_trigger.start()
+
   # Wait until not pressed before starting.
-  while trigger.is_pressed():
-    time.sleep(0.01)
+  while audio_trigger.is_pressed():
+    audio_trigger.wait_for_edge()
 
   print('Starting audio trigger loop.')
   while True:
-    pressed = trigger.is_pressed()
-    newly_pressed = pressed and not last_pressed
-    still_pressed = pressed and last_pressed
+    # Sleep until the trigger is pressed or released, waking early only when there is
+    # something to check: silence while recording, or a press being held down.
+    timeout = None
+    if listener.recording:
+      timeout = SILENCE_CHECK_SECONDS
+    if pressed and not hold_triggered:
+      hold_remaining = max(0, press_time + HOLD_SECONDS - time.time())
+      timeout = hold_remaining if timeout is None else min(timeout, hold_remaining)
+    edge = audio_trigger.wait_for_edge(timeout=timeout)
+
+    newly_pressed = edge is not None and edge.pressed
+    still_pressed = pressed and edge is None
+    if edge is not None:
+      pressed = edge.pressed
 
     now = time.time()
     if newly_pressed:
       last_press_time = press_time
-      press_time = now
+      press_time = edge.timestamp
       hold_triggered = False
     if still_pressed:
       press_duration = now - press_time
@@ -62,7 +112,7 @@ def main():
       logging.info(f'Three seconds of silence. Stopping. {filepath}')
       print(f'Three seconds of silence. Stopping. {filepath}')
       listener.stop()
-      enqueue_recording(audio_events_queue, filepath)
+      enqueue_recording(audio_events_queue, note_events_queue, filepath)
       last_filepath = filepath
       filepath = None
 
@@ -70,43 +120,43 @@ def main():
     elif newly_pressed and last_press_time and press_time - last_press_time < 0.5:
       if listener.recording:
         # We just started recording with the first push. Now we're going to stop.
-        listener.stop()
-        subprocess.call(['rm', filepath])
+        listener.stop(cancel=True)
+        segments.delete_recording(filepath)
         filepath = None
       else:
         # We stopped recording with the first push. Let's delete it.
-        subprocess.call(['rm', last_filepath])
+        segments.delete_recording(last_filepath)
 
       logging.info('Double pressed. Cancel.')
       print('Double pressed. Cancel.')
 
     elif newly_pressed and not listener.recording:
       # Start a recording by press.
-      filepath = make_filepath()
+      audio_format = audiolistener.get_audio_format()
+      filepath = make_filepath(audio_format.extension)
       logging.info(f'Start recording. {filepath}')
       print(f'Start recording. {filepath}')
-      listener.record(filepath)
+      listener.record(
+          filepath, audio_format,
+          on_segment=lambda segment_filepath: enqueue_segment(audio_events_queue, segment_filepath))
     elif newly_pressed and listener.recording:
       # Stop a recording by press.
       logging.info(f'Stop recording. {filepath}')
       print(f'Stop recording. {filepath}')
       listener.stop()
       # TODO(dbieber): Should wait to make sure it's not a double press.
-      enqueue_recording(audio_events_queue, filepath)
+      enqueue_recording(audio_events_queue, note_events_queue, filepath)
       last_filepath = filepath
       filepath = None
-    elif still_pressed and press_duration > 1 and not hold_triggered:
+    elif still_pressed and press_duration >= HOLD_SECONDS and not hold_triggered:
       hold_triggered = True
       logging.info('Held down for 1 second. Cancel and read back.')
       print('Held down for 1 second. Cancel and read back.')
       if listener.recording:
-        listener.stop()
-        subprocess.call(['rm', filepath])
+        listener.stop(cancel=True)
+        segments.delete_recording(filepath)
         filepath = None
-      subprocess.call(['aplay', last_filepath])
-
-    last_pressed = pressed
-    time.sleep(0.01)
+      play(last_filepath)
 
 
 if __name__ == '__main__':
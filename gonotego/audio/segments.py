@@ -0,0 +1,110 @@
+"""Speech segments written out while a recording is still in progress.
+
+As the voice activity detector closes speech segments at natural pauses, the speech is
+written to segment files next to the recording, e.g. out/20240101-1700000000000.segment-0.flac.
+The transcription runner transcribes each segment as soon as it is written, so when the
+recording stops only its last segment is left to transcribe.
+"""
+import glob
+import os
+import re
+
+import numpy as np
+import soundfile as sf
+
+from gonotego.audio import vad
+
+# Speech is written out once it spans at least this long. Longer segments give the
+# transcriber more context, while shorter ones leave less to transcribe after the recording stops.
+MIN_SEGMENT_SECONDS = 10
+SEGMENT_PATTERN = re.compile(r'\.segment-(\d+)\.flac$')
+
+
+def get_base(filepath):
+  """Returns the path shared by a recording and its segments, without any extension."""
+  match = SEGMENT_PATTERN.search(filepath)
+  if match:
+    return filepath[:match.start()]
+  return os.path.splitext(filepath)[0]
+
+
+def get_segment_filepath(filepath, index):
+  return f'{get_base(filepath)}.segment-{index}.flac'
+
+
+def get_segment_filepaths(filepath):
+  """Returns the paths of the segments of a recording, in order."""
+  segment_filepaths = []
+  for path in glob.glob(f'{glob.escape(get_base(filepath))}.segment-*.flac'):
+    match = SEGMENT_PATTERN.search(path)
+    if match:
+      segment_filepaths.append((int(match.group(1)), path))
+  return [path for _, path in sorted(segment_filepaths)]
+
+
+def delete_recording(filepath):
+  """Deletes a recording along with its segments and any files derived from them."""
+  for path in glob.glob(f'{glob.escape(get_base(filepath))}.*'):
+    os.remove(path)
+
+
+class SegmentWriter:
+  """Writes the speech in a recording to segment files as the speech segments close."""
+
+  def __init__(self, filepath, samplerate, on_segment):
+    """
+    Args:
+      filepath: The path of the recording.
+      samplerate: The sample rate of the recording.
+      on_segment: Called with the path of each segment once it is written.
+    """
+    self.filepath = filepath
+    self.samplerate = samplerate
+    self.on_segment = on_segment
+    self.index = 0
+    # Recorded audio not yet written to a segment, starting at sample blocks_start.
+    self.blocks = []
+    self.blocks_start = 0
+    self.sample_count = 0
+    # The start of the first closed speech segment not yet written, in seconds.
+    self.pending_start = None
+
+  def add(self, block, closed_segments):
+    """Adds a block of recorded audio and the speech segments that it closed."""
+    self.blocks.append(block)
+    self.sample_count += len(block)
+    for start, end in closed_segments:
+      if self.pending_start is None:
+        self.pending_start = start
+      if end - self.pending_start >= MIN_SEGMENT_SECONDS:
+        self.write(self.pending_start, end + vad.PADDING_SECONDS)
+        self.pending_start = None
+
+  def flush(self, open_segment):
+    """Writes any speech not yet written, through to the end of the recording.
+
+    Args:
+      open_segment: The speech segment still open when recording stopped, or None.
+    """
+    start = self.pending_start
+    if start is None and open_segment is not None:
+      start = open_segment[0]
+    if start is not None:
+      self.write(start, self.sample_count / self.samplerate)
+    self.pending_start = None
+
+  def write(self, start, end):
+    start_sample = max(self.blocks_start, int((start - vad.PADDING_SECONDS) * self.samplerate))
+    end_sample = min(self.sample_count, int(end * self.samplerate))
+    samples = np.concatenate(self.blocks)
+    # Audio before the end of this segment is never needed again.
+    self.blocks = [samples[end_sample - self.blocks_start:]]
+    segment_samples = samples[start_sample - self.blocks_start:end_sample - self.blocks_start]
+    self.blocks_start = end_sample
+    if not len(segment_samples):
+      return
+
+    segment_filepath = get_segment_filepath(self.filepath, self.index)
+    self.index += 1
+    sf.write(segment_filepath, segment_samples, self.samplerate, format='FLAC', subtype='PCM_16')
+    self.on_segment(segment_filepath)
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import soundfile as sf
+
+from gonotego.audio import segments
+from gonotego.audio import test_vad
+from gonotego.audio import vad
+
+SAMPLERATE = test_vad.SAMPLERATE
+BLOCKSIZE = 1024
+
+
+class SegmentsTest(unittest.TestCase):
+
+  def setUp(self):
+    self.rng = np.random.default_rng(0)
+    self.directory = tempfile.TemporaryDirectory()
+    self.filepath = os.path.join(self.directory.name, '20240101-1700000000000.wav')
+
+  def tearDown(self):
+    self.directory.cleanup()
+
+  def record(self, samples):
+    written = []
+    detector = vad.VoiceActivityDetector(SAMPLERATE)
+    writer = segments.SegmentWriter(self.filepath, SAMPLERATE, written.append)
+    for start in range(0, len(samples), BLOCKSIZE):
+      block = samples[start:start + BLOCKSIZE]
+      writer.add(block, detector.process(block))
+    writer.flush(detector.open_segment())
+    return written
+
+  def test_segments_cover_speech(self):
+    samples = np.concatenate([
+        test_vad.make_noise(1, self.rng),
+        test_vad.make_speech(6, self.rng),
+        test_vad.make_noise(1, self.rng),
+        test_vad.make_speech(5, self.rng),  # Closes the first segment, 11s after its start.
+        test_vad.make_noise(1, self.rng),
+        test_vad.make_speech(2, self.rng),  # Still open when recording stops.
+    ])
+    written = self.record(samples)
+    self.assertEqual(written, segments.get_segment_filepaths(self.filepath))
+    self.assertEqual(len(written), 2)
+
+    durations = [sf.info(path).duration for path in written]
+    self.assertAlmostEqual(durations[0], 12.5, delta=0.2)
+    # From just before the last speech to the end of the recording.
+    self.assertAlmostEqual(durations[1], 2.25, delta=0.2)
+
+  def test_no_speech(self):
+    self.assertEqual(self.record(test_vad.make_noise(3, self.rng)), [])
+
+  def test_get_segment_filepaths(self):
+    for index in [10, 2, 0]:
+      open(segments.get_segment_filepath(self.filepath, index), 'w').close()
+    # Files derived from segments are not segments.
+    open(os.path.join(self.directory.name, '20240101-1700000000000.segment-0.processed.flac'), 'w').close()
+    self.assertEqual(
+        [os.path.basename(path) for path in segments.get_segment_filepaths(self.filepath)],
+        ['20240101-1700000000000.segment-0.flac',
+         '20240101-1700000000000.segment-2.flac',
+         '20240101-1700000000000.segment-10.flac'])
+    self.assertEqual(segments.get_base(segments.get_segment_filepath(self.filepath, 2)),
+                     os.path.splitext(self.filepath)[0])
+
+  def test_delete_recording(self):
+    other_filepath = os.path.join(self.directory.name, '20240101-17000000000001.wav')
+    for path in [self.filepath, segments.get_segment_filepath(self.filepath, 0), other_filepath]:
+      open(path, 'w').close()
+    segments.delete_recording(self.filepath)
+    self.assertEqual(os.listdir(self.directory.name), [os.path.basename(other_filepath)])
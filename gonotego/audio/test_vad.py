@@ -0,0 +1,80 @@
+import unittest
+
+import numpy as np
+
+from gonotego.audio import vad
+
+SAMPLERATE = 16000
+
+
+def make_noise(seconds, rng):
+  return 0.003 * rng.standard_normal(int(SAMPLERATE * seconds))
+
+
+def make_speech(seconds, rng):
+  # A voiced sound: a low tone with a syllable-rate amplitude envelope, plus noise.
+  t = np.arange(int(SAMPLERATE * seconds)) / SAMPLERATE
+  envelope = 1 + 0.5 * np.sin(2 * np.pi * 3 * t)
+  return 0.3 * envelope * np.sin(2 * np.pi * 180 * t) + make_noise(seconds, rng)
+
+
+class VoiceActivityDetectorTest(unittest.TestCase):
+
+  def setUp(self):
+    self.rng = np.random.default_rng(0)
+
+  def test_detect_segments(self):
+    samples = np.concatenate([
+        make_noise(1, self.rng),
+        make_speech(1.5, self.rng),
+        make_noise(0.3, self.rng),  # A short pause within a segment.
+        make_speech(1, self.rng),
+        make_noise(2, self.rng),
+        make_speech(0.8, self.rng),
+        make_noise(1, self.rng),
+    ])
+    segments = vad.detect_segments(samples, SAMPLERATE)
+    self.assertEqual(len(segments), 2)
+    (start1, end1), (start2, end2) = segments
+    self.assertAlmostEqual(start1, 1.0, delta=0.1)
+    self.assertAlmostEqual(end1, 3.8, delta=0.1)
+    self.assertAlmostEqual(start2, 5.8, delta=0.1)
+    self.assertAlmostEqual(end2, 6.6, delta=0.1)
+
+  def test_block_size_does_not_matter(self):
+    samples = np.concatenate([
+        make_noise(1, self.rng),
+        make_speech(1, self.rng),
+        make_noise(1, self.rng),
+    ])
+    self.assertEqual(
+        vad.detect_segments(samples, SAMPLERATE, block_seconds=1.0),
+        vad.detect_segments(samples, SAMPLERATE, block_seconds=0.064))
+
+  def test_silence_length(self):
+    detector = vad.VoiceActivityDetector(SAMPLERATE)
+    detector.process(make_noise(2, self.rng))
+    # Leading silence does not count.
+    self.assertEqual(detector.silence_length(), 0)
+    self.assertFalse(detector.has_speech())
+
+    detector.process(make_speech(1, self.rng))
+    detector.process(make_noise(2, self.rng))
+    self.assertTrue(detector.has_speech())
+    self.assertAlmostEqual(detector.silence_length(), 2.0, delta=0.1)
+
+  def test_click_does_not_hide_speech(self):
+    # A single loud click should not raise the bar for the speech that follows it.
+    click = np.zeros(int(SAMPLERATE * 0.01))
+    click[0] = 1.0
+    samples = np.concatenate([
+        make_noise(1, self.rng),
+        click,
+        make_noise(1, self.rng),
+        0.1 * make_speech(1, self.rng),
+        make_noise(1, self.rng),
+    ])
+    segments = vad.detect_segments(samples, SAMPLERATE)
+    start, end = segments[-1]
+    self.assertAlmostEqual(start, 2.0, delta=0.1)
+    self.assertAlmostEqual(end, 3.0, delta=0.1)
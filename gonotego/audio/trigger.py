@@ -1,40 +1,97 @@
+from typing import Optional
+
+import dataclasses
+import queue
+import threading
+import time
+
 try:
-  import board
-  from digitalio import DigitalInOut, Direction, Pull
+  import gpiozero
 except:
-  print('Unable to import board and digitalio.')
-  board = None
+  print('Unable to import gpiozero.')
+  gpiozero = None
 import keyboard
 
 from gonotego.settings import settings
 
+# The "onboard button" is the physical button on the Voice Bonnet.
+ONBOARD_BUTTON_PIN = 17
+# The "red button" is the handheld round one that's really satisfying to push.
+RED_BUTTON_PIN = 27
+# Button contacts bounce for a few milliseconds when pressed or released.
+BOUNCE_SECONDS = 0.02
+
+HOTKEY_SOURCE = 'hotkey'
+
+
+@dataclasses.dataclass
+class TriggerEdge:
+  __slots__ = ('pressed', 'timestamp')
+  pressed: bool
+  timestamp: float
+
+
+class Trigger:
+  """Reports presses and releases of the audio trigger as they happen.
+
+  The trigger is pressed while any of its sources is pressed: the onboard button, the red
+  button, or the HOTKEY on the keyboard. Rather than being polled, the sources report
+  changes through GPIO edge callbacks and keyboard hooks, and each change in the overall
+  pressed state is delivered as a TriggerEdge by wait_for_edge.
+  """
+
+  def __init__(self):
+    self.edges = queue.Queue()
+    self.lock = threading.Lock()
+    self.pressed_sources = set()
+    self.pressed = False
+    self.buttons = []
+
+  def start(self):
+    if gpiozero is not None:
+      for source, pin in (('onboard_button', ONBOARD_BUTTON_PIN), ('red_button', RED_BUTTON_PIN)):
+        # Failing to set up a button raises, rather than leaving a button that does nothing.
+        button = gpiozero.Button(pin, pull_up=True, bounce_time=BOUNCE_SECONDS)
+        button.when_pressed = lambda source=source: self.set_source_pressed(source, True)
+        button.when_released = lambda source=source: self.set_source_pressed(source, False)
+        if button.is_pressed:
+          self.set_source_pressed(source, True)
+        self.buttons.append(button)
+    keyboard.hook(self.on_key_event)
+
+  def on_key_event(self, event):
+    try:
+      hotkey_pressed = keyboard.is_pressed(settings.get('HOTKEY'))
+    except:
+      # If HOTKEY is not a valid key, the hotkey never triggers.
+      hotkey_pressed = False
+    self.set_source_pressed(HOTKEY_SOURCE, hotkey_pressed)
+
+  def set_source_pressed(self, source, pressed):
+    with self.lock:
+      if pressed:
+        self.pressed_sources.add(source)
+      else:
+        self.pressed_sources.discard(source)
+      pressed = bool(self.pressed_sources)
+      if pressed == self.pressed:
+        # Key repeats and presses of a second source while one is held are not edges.
+        return
+      self.pressed = pressed
+      self.edges.put(TriggerEdge(pressed=pressed, timestamp=time.time()))
+
+  def is_pressed(self):
+    return self.pressed
+
+  def wait_for_edge(self, timeout=None) -> Optional[TriggerEdge]:
+    """Blocks until the trigger is pressed or released.
 
-if board is not None:
-  # The "onboard button" is the physical button on the Voice Bonnet.
-  onboard_button = DigitalInOut(board.D17)
-  onboard_button.direction = Direction.INPUT
-  onboard_button.pull = Pull.UP
-
-  # The "red button" is the handheld round one that's really satisfying to push.
-  red_button = DigitalInOut(board.D27)
-  red_button.direction = Direction.INPUT
-  red_button.pull = Pull.UP
-else:
-  onboard_button = None
-  red_button = None
-
-
-def is_pressed():
-  if onboard_button is not None:
-    button_pressed = (
-        not onboard_button.value
-        or not red_button.value
-    )
-  else:
-    button_pressed = False
-  audio_hotkey_pressed = False
-  try:
-    audio_hotkey_pressed = keyboard.is_pressed(settings.get("HOTKEY"))
-  except:
-    pass
-  return audio_hotkey_pressed or button_pressed
+    Args:
+      timeout: The maximum number of seconds to wait, or None to wait indefinitely.
+    Returns:
+      The TriggerEdge, or None if the timeout elapsed first.
+    """
+    try:
+      return self.edges.get(timeout=timeout)
+    except queue.Empty:
+      return None
@@ -0,0 +1,168 @@
+"""Voice activity detection for recorded audio.
+
+Audio is split into short frames, and each frame is classified as speech or non-speech
+from two features computed with NumPy over a whole block of frames at once: short-time
+energy and zero-crossing rate. A frame is speech if its energy is sufficiently far above
+an adaptive estimate of the background noise floor, which tracks the quietest recent
+frame. Frames with a high zero-crossing rate (hiss, fans, wind) must clear a higher bar,
+since broadband noise crosses zero far more often than voiced speech.
+
+Speech frames separated by less than a minimum pause are merged into segments.
+"""
+import numpy as np
+
+FRAME_SECONDS = 0.02
+# How far above the noise floor a frame's energy must be to count as speech.
+THRESHOLD_DB = 10.0
+# Frames quieter than this are never speech, however low the noise floor.
+MIN_SPEECH_DB = -50.0
+# Frames quieter than this are digital silence (e.g. while the input starts up) rather than
+# background noise, and are ignored when estimating the noise floor.
+DIGITAL_SILENCE_DB = -90.0
+# Frames with a zero-crossing rate above this need twice the threshold to count as speech.
+MAX_VOICED_ZCR = 0.25
+# The noise floor is the energy of the quietest frame in this trailing window. Natural speech
+# pauses often enough that the window almost always includes some background noise.
+NOISE_WINDOW_SECONDS = 5.0
+# Speech separated by a shorter pause than this belongs to the same segment.
+MIN_PAUSE_SECONDS = 0.5
+# Audio kept on either side of each speech segment when it is cut out of a recording,
+# so that words are not clipped.
+PADDING_SECONDS = 0.25
+EPSILON = 1e-10
+
+
+class VoiceActivityDetector:
+  """Incrementally finds the speech segments in a stream of audio blocks."""
+
+  def __init__(self, samplerate, frame_seconds=FRAME_SECONDS, threshold_db=THRESHOLD_DB,
+               min_pause_seconds=MIN_PAUSE_SECONDS):
+    self.samplerate = samplerate
+    self.frame_length = max(1, int(round(samplerate * frame_seconds)))
+    self.frame_seconds = self.frame_length / samplerate
+    self.threshold_db = threshold_db
+    self.min_pause_frames = int(round(min_pause_seconds / self.frame_seconds))
+    self.noise_window_frames = int(round(NOISE_WINDOW_SECONDS / self.frame_seconds))
+
+    self.noise_floor_db = None
+    # The energies of recent frames, for estimating the noise floor.
+    self.recent_energy_db = np.zeros(0, dtype=np.float32)
+    # Samples left over from the previous block that did not fill a whole frame.
+    self.leftover = np.zeros(0, dtype=np.float32)
+    self.frame_count = 0
+    # The current segment, as frame indexes [segment_start, segment_end).
+    self.segment_start = None
+    self.segment_end = None
+    # Closed segments, as frame indexes [start, end).
+    self.closed_segments = []
+
+  def process(self, block):
+    """Processes a block of audio samples.
+
+    Args:
+      block: An array of samples, shaped (samples,) or (samples, channels).
+    Returns:
+      The speech segments closed by this block, as (start_seconds, end_seconds) pairs.
+    """
+    block = np.asarray(block, dtype=np.float32)
+    if block.ndim > 1:
+      block = block.mean(axis=1)
+    samples = np.concatenate((self.leftover, block))
+    num_frames = len(samples) // self.frame_length
+    self.leftover = samples[num_frames * self.frame_length:]
+    if num_frames == 0:
+      return []
+    frames = samples[:num_frames * self.frame_length].reshape(num_frames, self.frame_length)
+
+    energy_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + EPSILON)
+    zcr = np.count_nonzero(np.diff(np.signbit(frames), axis=1), axis=1) / self.frame_length
+
+    self.update_noise_floor(energy_db)
+    if self.noise_floor_db is None:
+      # Nothing but digital silence so far.
+      is_speech = np.zeros(num_frames, dtype=bool)
+    else:
+      margin_db = energy_db - self.noise_floor_db
+      is_speech = (
+          (energy_db > MIN_SPEECH_DB)
+          & (margin_db > np.where(zcr > MAX_VOICED_ZCR, 2 * self.threshold_db, self.threshold_db))
+      )
+
+    speech_frames = np.flatnonzero(is_speech) + self.frame_count
+    self.frame_count += num_frames
+    return self.update_segments(speech_frames)
+
+  def update_noise_floor(self, energy_db):
+    energy_db = energy_db[energy_db > DIGITAL_SILENCE_DB]
+    self.recent_energy_db = np.concatenate((self.recent_energy_db, energy_db))[-self.noise_window_frames:]
+    if len(self.recent_energy_db):
+      self.noise_floor_db = float(np.min(self.recent_energy_db))
+
+  def update_segments(self, speech_frames):
+    closed = []
+    if len(speech_frames):
+      # Split the speech frames wherever they are separated by at least a minimum pause.
+      breaks = np.flatnonzero(np.diff(speech_frames) > self.min_pause_frames)
+      starts = np.concatenate(([speech_frames[0]], speech_frames[breaks + 1]))
+      ends = np.concatenate((speech_frames[breaks], [speech_frames[-1]])) + 1
+      for start, end in zip(starts.tolist(), ends.tolist()):
+        if self.segment_end is not None and start - self.segment_end < self.min_pause_frames:
+          # Continues the current segment.
+          self.segment_end = end
+        else:
+          if self.segment_start is not None:
+            closed.append(self.close_segment())
+          self.segment_start, self.segment_end = start, end
+
+    # Close the current segment if it has been followed by a long enough pause.
+    if self.segment_end is not None and self.frame_count - self.segment_end >= self.min_pause_frames:
+      closed.append(self.close_segment())
+    return closed
+
+  def close_segment(self):
+    segment = (self.segment_start, self.segment_end)
+    self.closed_segments.append(segment)
+    self.segment_start = self.segment_end = None
+    return self.to_seconds(segment)
+
+  def to_seconds(self, segment):
+    start, end = segment
+    return start * self.frame_seconds, end * self.frame_seconds
+
+  def segments(self):
+    """Returns all speech segments so far, including any still open, in seconds."""
+    segments = [self.to_seconds(segment) for segment in self.closed_segments]
+    if self.segment_start is not None:
+      segments.append(self.open_segment())
+    return segments
+
+  def open_segment(self):
+    """Returns the speech segment that has not yet been closed by a pause, or None."""
+    if self.segment_start is None:
+      return None
+    return self.to_seconds((self.segment_start, self.segment_end))
+
+  def has_speech(self):
+    return bool(self.closed_segments) or self.segment_start is not None
+
+  def silence_length(self):
+    """Returns the seconds of non-speech since the most recent speech.
+
+    Returns 0 if there has been no speech yet, so that leading silence is not counted.
+    """
+    if self.segment_end is not None:
+      last_speech_end = self.segment_end
+    elif self.closed_segments:
+      last_speech_end = self.closed_segments[-1][1]
+    else:
+      return 0
+    return (self.frame_count - last_speech_end) * self.frame_seconds
+
+
+def detect_segments(samples, samplerate, block_seconds=1.0, **kwargs):
+  """Returns the speech segments in samples, as (start_seconds, end_seconds) pairs."""
+  vad = VoiceActivityDetector(samplerate, **kwargs)
+  block_length = int(samplerate * block_seconds)
+  for start in range(0, len(samples), block_length):
+    vad.process(samples[start:start + block_length])
+  return vad.segments()
@@ -1,13 +1,11 @@
 """Assistant commands. Commands for using the AI assistant."""
 
-import openai
-
 from gonotego.command_center import note_commands
 from gonotego.command_center import registry
 from gonotego.command_center import system_commands
 from gonotego.common import events
 from gonotego.common import interprocess
-from gonotego.settings import settings
+from gonotego.common import openai_client
 
 register_command = registry.register_command
 
@@ -23,26 +21,28 @@ def create_completion(
     presence_penalty=0,
     **kwargs
 ):
-  client = openai.OpenAI(api_key=settings.get('OPENAI_API_KEY'))
-  response = client.completions.create(
-      model=model,
-      prompt=prompt,
-      temperature=temperature,
-      max_tokens=max_tokens,
-      top_p=top_p,
-      frequency_penalty=frequency_penalty,
-      presence_penalty=presence_penalty,
-      **kwargs
-  )
+  client = openai_client.get_client()
+  with openai_client.timed('completion'):
+    response = client.completions.create(
+        model=model,
+        prompt=prompt,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        top_p=top_p,
+        frequency_penalty=frequency_penalty,
+        presence_penalty=presence_penalty,
+        **kwargs
+    )
   return response
 
 
 def chat_completion(messages, model='gpt-3.5-turbo'):
-  client = openai.OpenAI(api_key=settings.get('OPENAI_API_KEY'))
-  response = client.chat.completions.create(
-      model=model,
-      messages=messages
-  )
+  client = openai_client.get_client()
+  with openai_client.timed('chat completion'):
+    response = client.chat.completions.create(
+        model=model,
+        messages=messages
+    )
   return response
 
 
@@ -105,8 +105,9 @@ def chat_with_context(prompt=None, model='gpt-3.5-turbo'):
 def get_messages(prompt=None):
   note_events_session_queue = interprocess.get_note_events_session_queue()
   note_event_bytes_list = note_events_session_queue.peek_all()
+  # Only the text of submitted notes is needed, so decode lazily.
   note_events = [
-      events.NoteEvent.from_bytes(note_event_bytes)
+      events.NoteEvent.lazy_from_bytes(note_event_bytes)
       for note_event_bytes in note_event_bytes_list
   ]
 
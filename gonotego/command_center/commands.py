@@ -21,6 +21,16 @@ register_command = registry.register_command
 @register_command('read')
 def read_latest():
   note_events_queue = interprocess.get_note_events_queue()
-  note_event_bytes = note_events_queue.latest()
-  note_event = events.NoteEvent.from_bytes(note_event_bytes)
-  system_commands.say(note_event.text)
+  note_event_bytes_list = [note_events_queue.latest()]
+  # The latest note event may be a transcription placeholder, or a structural event like an
+  # indent, so fall back on the notes of the session, latest first.
+  note_events_session_queue = interprocess.get_note_events_session_queue()
+  note_event_bytes_list.extend(reversed(note_events_session_queue.peek_all()))
+  for note_event_bytes in note_event_bytes_list:
+    if note_event_bytes is None:
+      continue
+    note_event = events.NoteEvent.from_bytes(note_event_bytes)
+    if note_event.action in (events.SUBMIT, events.UPDATE) and note_event.text:
+      system_commands.say(note_event.text)
+      return
+  system_commands.say('No notes to read.')
@@ -4,6 +4,7 @@ from gonotego.command_center import registry
 from gonotego.command_center import system_commands
 from gonotego.common import events
 from gonotego.common import interprocess
+from gonotego.common import journal
 
 
 register_command = registry.register_command
@@ -13,51 +14,48 @@ def get_timestamp():
   return time.time()
 
 
-@register_command('note {}')
-def add_note(text):
+def put_note_events(note_events):
+  """Journals the note events, then writes them to both note queues in a single round trip."""
   note_events_queue = interprocess.get_note_events_queue()
   note_events_session_queue = interprocess.get_note_events_session_queue()
+  journal.put_many(
+      [note_events_queue, note_events_session_queue],
+      [bytes(note_event) for note_event in note_events])
+
 
+@register_command('note {}')
+def add_note(text):
   note_event = events.NoteEvent(
       text=text,
       action=events.SUBMIT,
       audio_filepath=None,
       timestamp=get_timestamp())
-  note_events_queue.put(bytes(note_event))
-  note_events_session_queue.put(bytes(note_event))
+  put_note_events([note_event])
 
 
 @register_command('subnote {}')
 def add_indented_note(text):
-  note_events_queue = interprocess.get_note_events_queue()
-  note_events_session_queue = interprocess.get_note_events_session_queue()
-
-  # Indent
-  note_event = events.NoteEvent(
-      text=None,
-      action=events.INDENT,
-      audio_filepath=None,
-      timestamp=get_timestamp())
-  note_events_queue.put(bytes(note_event))
-  note_events_session_queue.put(bytes(note_event))
-
-  # The note
-  note_event = events.NoteEvent(
-      text=text,
-      action=events.SUBMIT,
-      audio_filepath=None,
-      timestamp=get_timestamp())
-  note_events_queue.put(bytes(note_event))
-  note_events_session_queue.put(bytes(note_event))
-
-  # Dedent
-  note_event = events.NoteEvent(
-      text=None,
-      action=events.UNINDENT,
-      audio_filepath=None,
-      timestamp=get_timestamp())
-  note_events_queue.put(bytes(note_event))
-  note_events_session_queue.put(bytes(note_event))
+  note_events = [
+      # Indent
+      events.NoteEvent(
+          text=None,
+          action=events.INDENT,
+          audio_filepath=None,
+          timestamp=get_timestamp()),
+      # The note
+      events.NoteEvent(
+          text=text,
+          action=events.SUBMIT,
+          audio_filepath=None,
+          timestamp=get_timestamp()),
+      # Dedent
+      events.NoteEvent(
+          text=None,
+          action=events.UNINDENT,
+          audio_filepath=None,
+          timestamp=get_timestamp()),
+  ]
+  put_note_events(note_events)
 
 
 @register_command('todo {}')
@@ -1,5 +1,4 @@
 import sys
-import time
 
 from gonotego.common import events
 from gonotego.common import interprocess
@@ -29,18 +28,19 @@ def main():
   executor = Executor(scheduler=scheduler.Scheduler())
   scheduler.executor_singleton = executor
   while True:
-    while command_events_queue.size() > 0:
-      # We commit the item before executing the command.
-      # So, if the command fails, it will not be re-executed.
-      command_event_bytes = command_events_queue.get()
-      command_events_queue.commit(command_event_bytes)
-
-      command_event = events.CommandEvent.from_bytes(command_event_bytes)
-      command_text = command_event.command_text
-      executor.execute(command_text)
-      sys.stdout.flush()
-      sys.stderr.flush()
-    time.sleep(1)
+    # Block until a command arrives.
+    command_event_bytes = command_events_queue.get(timeout=0)
+    # We commit the item before executing the command.
+    # So, if the command fails, it will not be re-executed.
+    command_events_queue.commit(command_event_bytes)
+    if command_event_bytes is None:
+      continue
+
+    command_event = events.CommandEvent.from_bytes(command_event_bytes)
+    command_text = command_event.command_text
+    executor.execute(command_text)
+    sys.stdout.flush()
+    sys.stderr.flush()
 
 
 if __name__ == '__main__':
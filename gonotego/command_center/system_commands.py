@@ -79,14 +79,15 @@ def say(text):
 
 @register_command('say_openai {}')
 def say_with_openai(text):
-  import openai
-  client = openai.OpenAI(api_key=settings.get('OPENAI_API_KEY'))
-  response = client.audio.speech.create(
-      model="tts-1",
-      voice="alloy",
-      input=text
-  )
-  response.write_to_file('output.mp3')
+  from gonotego.common import openai_client
+  client = openai_client.get_client()
+  with openai_client.timed('speech'):
+    response = client.audio.speech.create(
+        model="tts-1",
+        voice="alloy",
+        input=text
+    )
+    response.write_to_file('output.mp3')
   play_mp3('output.mp3')
 
 
@@ -3,8 +3,11 @@ from typing import Text, Tuple
 import dataclasses
 from datetime import datetime
 import json
+import struct
 
 AUDIO_DONE = 'done'
+# A speech segment of a recording still in progress. See gonotego/audio/segments.py.
+AUDIO_SEGMENT = 'segment'
 
 SUBMIT = 'submit'
 UNINDENT = 'unindent'
@@ -12,10 +15,21 @@ INDENT = 'indent'
 CLEAR_EMPTY = 'clear_empty'
 ENTER_EMPTY = 'enter_empty'
 END_SESSION = 'end_session'
+# A note for a recording that is still being transcribed. Its audio_filepath identifies it
+# to the UPDATE note event that carries its transcript.
+AUDIO_PLACEHOLDER = 'audio_placeholder'
+# Replaces the text of the placeholder note with the same audio_filepath.
+# An UPDATE with empty text removes the placeholder.
+UPDATE = 'update'
+
+
+# The event classes declare __slots__ so that instances carry no per-instance __dict__.
+# They are not frozen, since frozen dataclasses pay for object.__setattr__ on construction.
 
 
 @dataclasses.dataclass
 class AudioEvent:
+  __slots__ = ('action', 'filepath')
   action: Text
   filepath: Text
 
@@ -30,6 +44,7 @@ class AudioEvent:
 
 @dataclasses.dataclass
 class CommandEvent:
+  __slots__ = ('command_text',)
   command_text: Text
 
   def __bytes__(self):
@@ -40,28 +55,162 @@ class CommandEvent:
     return CommandEvent(command_text)
 
 
+# NoteEvents are encoded as a fixed-size header followed by the UTF-8 bytes of the action,
+# text, and audio_filepath fields, in that order. The header holds a version byte, flags
+# marking which fields are None, the timestamp, and the byte length of each string field.
+# The version byte is never '{', which distinguishes the binary encoding from the JSON
+# encoding used by earlier versions of Go Note Go, so queued JSON events still decode.
+NOTE_EVENT_VERSION = 1
+NOTE_EVENT_HEADER = struct.Struct('<BBdHII')
+ACTION_NONE = 1 << 0
+TEXT_NONE = 1 << 1
+AUDIO_FILEPATH_NONE = 1 << 2
+TIMESTAMP_NONE = 1 << 3
+
+
+def encode_optional(value, none_flag):
+  """Returns the flag and UTF-8 bytes to use for an optional string field."""
+  if value is None:
+    return none_flag, b''
+  return 0, value.encode('utf-8')
+
+
+def decode_optional(b, start, end, flags, none_flag):
+  if flags & none_flag:
+    return None
+  return b[start:end].decode('utf-8')
+
+
+def unpack_note_event_header(b):
+  """Returns the flags, timestamp, and field boundaries of a binary encoded NoteEvent.
+
+  The field boundaries are the offsets where the action, text, and audio_filepath fields
+  start, followed by the offset where the audio_filepath field ends.
+  """
+  version, flags, timestamp, action_length, text_length, audio_filepath_length = (
+      NOTE_EVENT_HEADER.unpack_from(b))
+  if version != NOTE_EVENT_VERSION:
+    raise ValueError('Unexpected NoteEvent encoding version', version)
+  action_start = NOTE_EVENT_HEADER.size
+  text_start = action_start + action_length
+  audio_filepath_start = text_start + text_length
+  audio_filepath_end = audio_filepath_start + audio_filepath_length
+  if flags & TIMESTAMP_NONE:
+    timestamp = None
+  return flags, timestamp, action_start, text_start, audio_filepath_start, audio_filepath_end
+
+
+# Marks the fields of a LazyNoteEvent that have not been decoded yet, since None is a value.
+_UNDECODED = object()
+
+
 @dataclasses.dataclass
 class NoteEvent:
+  __slots__ = ('text', 'action', 'audio_filepath', 'timestamp')
   text: Text
   action: Text
   audio_filepath: Text
   timestamp: datetime
 
   def __bytes__(self):
-    return json.dumps(dataclasses.asdict(self)).encode('utf-8')
+    action_flag, action_bytes = encode_optional(self.action, ACTION_NONE)
+    text_flag, text_bytes = encode_optional(self.text, TEXT_NONE)
+    audio_filepath_flag, audio_filepath_bytes = encode_optional(self.audio_filepath, AUDIO_FILEPATH_NONE)
+    flags = action_flag | text_flag | audio_filepath_flag
+    if self.timestamp is None:
+      flags |= TIMESTAMP_NONE
+      timestamp = 0.0
+    else:
+      timestamp = float(self.timestamp)
+    header = NOTE_EVENT_HEADER.pack(
+        NOTE_EVENT_VERSION, flags, timestamp,
+        len(action_bytes), len(text_bytes), len(audio_filepath_bytes))
+    return b''.join((header, action_bytes, text_bytes, audio_filepath_bytes))
 
   def from_bytes(b):
-    d = json.loads(b.decode('utf-8'))
-    return NoteEvent(**d)
+    if b[:1] == b'{':
+      # Encoded as JSON by an earlier version of Go Note Go.
+      d = json.loads(b.decode('utf-8'))
+      return NoteEvent(**d)
+
+    flags, timestamp, action_start, text_start, audio_filepath_start, audio_filepath_end = (
+        unpack_note_event_header(b))
+    return NoteEvent(
+        decode_optional(b, text_start, audio_filepath_start, flags, TEXT_NONE),
+        decode_optional(b, action_start, text_start, flags, ACTION_NONE),
+        decode_optional(b, audio_filepath_start, audio_filepath_end, flags, AUDIO_FILEPATH_NONE),
+        timestamp,
+    )
+
+  def lazy_from_bytes(b):
+    """Like from_bytes, but each field is decoded only when it is first accessed.
+
+    Use this when reading many events of which only some fields are needed,
+    e.g. the action of every event but the text of only some.
+    """
+    if b[:1] == b'{':
+      return NoteEvent.from_bytes(b)
+    return LazyNoteEvent(b)
+
+
+class LazyNoteEvent:
+  """A read-only view of a binary encoded NoteEvent that decodes fields on access.
+
+  Each field is decoded the first time it is accessed, and kept for later accesses.
+  """
+  __slots__ = ('_bytes', '_flags', '_timestamp', '_action_start', '_text_start',
+               '_audio_filepath_start', '_audio_filepath_end',
+               '_text', '_action', '_audio_filepath')
+
+  def __init__(self, b):
+    self._bytes = b
+    (self._flags, self._timestamp, self._action_start, self._text_start,
+     self._audio_filepath_start, self._audio_filepath_end) = unpack_note_event_header(b)
+    self._text = self._action = self._audio_filepath = _UNDECODED
+
+  @property
+  def text(self):
+    if self._text is _UNDECODED:
+      self._text = decode_optional(
+          self._bytes, self._text_start, self._audio_filepath_start, self._flags, TEXT_NONE)
+    return self._text
+
+  @property
+  def action(self):
+    if self._action is _UNDECODED:
+      self._action = decode_optional(
+          self._bytes, self._action_start, self._text_start, self._flags, ACTION_NONE)
+    return self._action
+
+  @property
+  def audio_filepath(self):
+    if self._audio_filepath is _UNDECODED:
+      self._audio_filepath = decode_optional(
+          self._bytes, self._audio_filepath_start, self._audio_filepath_end, self._flags, AUDIO_FILEPATH_NONE)
+    return self._audio_filepath
+
+  @property
+  def timestamp(self):
+    return self._timestamp
+
+  def to_note_event(self):
+    return NoteEvent(self.text, self.action, self.audio_filepath, self.timestamp)
+
+  def __bytes__(self):
+    return self._bytes
+
+  def __repr__(self):
+    return f'Lazy{self.to_note_event()!r}'
 
 
 @dataclasses.dataclass
 class LEDEvent:
+  __slots__ = ('color', 'ids')
   color: Tuple[int]
   ids: Tuple[int]
 
   def __bytes__(self):
-    return json.dumps(dataclasses.asdict(self)).encode('utf-8')
+    return json.dumps({'color': self.color, 'ids': self.ids}).encode('utf-8')
 
   def from_bytes(b):
     d = json.loads(b.decode('utf-8'))
@@ -1,10 +1,30 @@
+"""Internet connectivity.
+
+The connectivity monitor (gonotego/connectivity/runner.py) is the only process that probes
+the network. It publishes the result to Status.INTERNET_AVAILABLE, and announces each change
+on INTERNET_CHANNEL. Everything else reads the published status, and waits for the
+announcement when offline. If the monitor is not running, wait_for_internet falls back
+to probing directly.
+"""
 import http.client
 import time
 
+from gonotego.common import interprocess
 from gonotego.common import status
 
 Status = status.Status
 
+# Announces each change in connectivity. Messages are b'1' (available) or b'0' (unavailable).
+INTERNET_CHANNEL = 'GoNoteGo:internet'
+# Set by the monitor with an expiry after every probe, so it disappears if the monitor stops.
+MONITOR_HEARTBEAT_KEY = 'GoNoteGo:internet_monitor'
+# How often to probe while connected.
+PROBE_INTERVAL_SECONDS = 30
+# While disconnected, probes back off exponentially between these delays.
+MIN_RETRY_SECONDS = 1
+MAX_RETRY_SECONDS = 8
+HEARTBEAT_EXPIRY_SECONDS = 3 * PROBE_INTERVAL_SECONDS
+
 
 def is_internet_available(url='www.google.com'):
   """Determines if we are connected to the Internet."""
@@ -18,8 +38,62 @@ def is_internet_available(url='www.google.com'):
     return False
 
 
+def is_monitored():
+  r = interprocess.get_redis_client()
+  return bool(r.exists(MONITOR_HEARTBEAT_KEY))
+
+
+def monitor(url='www.google.com'):
+  """Probes for connectivity forever, publishing each change."""
+  r = interprocess.get_redis_client()
+  available = None
+  retry_seconds = MIN_RETRY_SECONDS
+  while True:
+    now_available = is_internet_available(url)
+    if now_available != available:
+      available = now_available
+      print('Internet connection available.' if available else 'No internet connection available.')
+      status.set(Status.INTERNET_AVAILABLE, available)
+      r.publish(INTERNET_CHANNEL, b'1' if available else b'0')
+    r.set(MONITOR_HEARTBEAT_KEY, 1, ex=HEARTBEAT_EXPIRY_SECONDS)
+
+    if available:
+      retry_seconds = MIN_RETRY_SECONDS
+      time.sleep(PROBE_INTERVAL_SECONDS)
+    else:
+      time.sleep(retry_seconds)
+      retry_seconds = min(2 * retry_seconds, MAX_RETRY_SECONDS)
+
+
 def wait_for_internet(url='www.google.com', on_disconnect=None):
+  """Returns once connected to the Internet, calling on_disconnect first if not connected."""
+  if not is_monitored():
+    wait_for_internet_by_probing(url, on_disconnect)
+    return
+  if status.get(Status.INTERNET_AVAILABLE):
+    return
+
+  print('No internet connection available. Waiting.')
+  if on_disconnect is not None:
+    on_disconnect()
+  r = interprocess.get_redis_client()
+  pubsub = r.pubsub(ignore_subscribe_messages=True)
+  pubsub.subscribe(INTERNET_CHANNEL)
+  try:
+    # The status is checked after subscribing so that no change can be missed.
+    while not status.get(Status.INTERNET_AVAILABLE):
+      pubsub.get_message(timeout=HEARTBEAT_EXPIRY_SECONDS)
+      if not is_monitored():
+        wait_for_internet_by_probing(url)
+        break
+  finally:
+    pubsub.close()
+  print('Internet connection restored.')
+
+
+def wait_for_internet_by_probing(url='www.google.com', on_disconnect=None):
   first = True
+  retry_seconds = MIN_RETRY_SECONDS
   while not is_internet_available(url):
     if first:
       print('No internet connection available. Sleeping.')
@@ -27,7 +101,8 @@ def wait_for_internet(url='www.google.com', on_disconnect=None):
       first = False
       if on_disconnect is not None:
         on_disconnect()
-    time.sleep(60)
+    time.sleep(retry_seconds)
+    retry_seconds = min(2 * retry_seconds, MAX_RETRY_SECONDS)
   if not first:
     print('Internet connection restored.')
   status.set(Status.INTERNET_AVAILABLE, True)
@@ -1,8 +1,74 @@
+import collections
+import math
+import os
+import time
+
 import redis
 
+REDIS_HOST = 'localhost'
+REDIS_PORT = 6379
+REDIS_DB = 0
+# Set by the `unixsocket` option in /etc/redis/redis.conf. See .github/scripts/setup_boot.sh.
+REDIS_SOCKET_PATH = '/run/redis/redis-server.sock'
+
+_client = None
+
+LIST_BACKEND = 'list'
+STREAM_BACKEND = 'stream'
+# The backend for each queue: InterprocessQueue ('list') or StreamQueue ('stream').
+# A queue must be empty when its backend is changed, since the two store items differently.
+QUEUE_BACKENDS = {
+    'audio_events_queue': LIST_BACKEND,
+    'command_events_queue': LIST_BACKEND,
+    'note_events_queue': LIST_BACKEND,
+    'note_events_session_queue': LIST_BACKEND,
+}
+
+# Stream queues store each item under this field of its stream entry.
+STREAM_FIELD = 'value'
+DEFAULT_GROUP = 'GoNoteGo'
+# Pending entries idle for this long are assumed to belong to a consumer that is gone.
+CLAIM_IDLE_MS = 10 * 60 * 1000
+
+# Removes the first #ARGV items from the list at KEYS[1] if and only if they equal ARGV.
+# Returns 1 if the items were removed and 0 otherwise.
+COMMIT_BATCH_SCRIPT = """
+local n = #ARGV
+local values = redis.call('LRANGE', KEYS[1], 0, n - 1)
+if #values ~= n then
+  return 0
+end
+for i = 1, n do
+  if values[i] ~= ARGV[i] then
+    return 0
+  end
+end
+redis.call('LTRIM', KEYS[1], n, -1)
+return 1
+"""
+
+
+def make_connection_pool():
+  """Makes a connection pool, preferring the local unix socket over TCP when available."""
+  if os.path.exists(REDIS_SOCKET_PATH):
+    return redis.ConnectionPool(
+        connection_class=redis.UnixDomainSocketConnection,
+        path=REDIS_SOCKET_PATH,
+        db=REDIS_DB,
+    )
+  return redis.ConnectionPool(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB)
+
 
 def get_redis_client():
-  return redis.Redis(host='localhost', port=6379, db=0)
+  """Returns the redis client shared by everything in this process.
+
+  The client is backed by a connection pool, so it is safe to use from multiple
+  threads and connections are reused across calls rather than opened per call.
+  """
+  global _client
+  if _client is None:
+    _client = redis.Redis(connection_pool=make_connection_pool())
+  return _client
 
 
 class InterprocessQueue:
@@ -11,18 +77,80 @@ class InterprocessQueue:
     self.key = key
     self.r = get_redis_client()
     self.index = 0
+    self._commit_batch_script = self.r.register_script(COMMIT_BATCH_SCRIPT)
 
   def put(self, value):
-    self.r.set(f'{self.key}:latest', value)
-    return self.r.rpush(self.key, value)
+    pipe = self.r.pipeline(transaction=False)
+    self.add_put_commands(pipe, [value])
+    size, *unused_results = pipe.execute()
+    return size
+
+  def add_put_commands(self, pipe, values):
+    """Adds the commands for putting values onto this queue to a redis pipeline.
+
+    The RPUSH is added first, so its result (the new size of the queue) comes first.
+    """
+    pipe.rpush(self.key, *values)
+    pipe.set(f'{self.key}:latest', values[-1])
+    # Wake up a consumer blocked in get, if there is one.
+    # The signal list holds at most one token, so it stays small even for queues
+    # that no consumer ever blocks on (e.g. the note events session queue).
+    signal_key = f'{self.key}:signal'
+    pipe.lpush(signal_key, 1)
+    pipe.ltrim(signal_key, 0, 0)
+
+  def get(self, timeout=None):
+    """Gets the next item in the queue. Does not remove it from the queue.
 
-  def get(self):
-    """Gets the next item in the queue. Does not remove it from the queue."""
+    Args:
+      timeout: If None, returns immediately. Otherwise blocks for up to timeout seconds
+        waiting for an item to arrive. A timeout of 0 blocks indefinitely.
+    Returns:
+      The next item in the queue, or None if there is no item available.
+    """
     value = self.r.lindex(self.key, self.index)
+    if value is None and timeout is not None:
+      value = self._wait(timeout, lambda: self.r.lindex(self.key, self.index))
     if value is not None:
       self.index += 1
     return value
 
+  def get_batch(self, max_items, timeout=None):
+    """Gets up to max_items next items in the queue. Does not remove them from the queue.
+
+    Args:
+      max_items: The maximum number of items to return.
+      timeout: As in get. Only applies while waiting for the first item.
+    Returns:
+      A list of the next items in the queue, empty if there are none available.
+    """
+    def read():
+      return self.r.lrange(self.key, self.index, self.index + max_items - 1)
+
+    values = read()
+    if not values and timeout is not None:
+      values = self._wait(timeout, read) or []
+    self.index += len(values)
+    return values
+
+  def _wait(self, timeout, read):
+    """Blocks until read() returns a truthy result, or until the timeout elapses."""
+    deadline = None if timeout == 0 else time.time() + timeout
+    while True:
+      if deadline is None:
+        remaining = 0
+      else:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+          return None
+        # BLPOP timeouts are whole seconds in older versions of redis.
+        remaining = max(1, math.ceil(remaining))
+      # Block until a producer signals that it has pushed a new item.
+      self.r.blpop(f'{self.key}:signal', timeout=remaining)
+      result = read()
+      if result:
+        return result
+
   def peek_all(self):
     return self.r.lrange(self.key, self.index, -1)
 
@@ -48,6 +176,27 @@ class InterprocessQueue:
     assert self.index >= 0
     assert value == pop_value
 
+  def commit_batch(self, values):
+    """Removes the next len(values) items in the queue, asserting they match values.
+
+    The check and the removal happen atomically in a single round trip. This is the
+    batch equivalent of commit, for use with get_batch.
+
+    Args:
+      values: The expected values for the leftmost items in the queue, in order.
+    """
+    if not values:
+      return
+
+    committed = self._commit_batch_script(keys=[self.key], args=values)
+    self.index -= len(values)
+    assert self.index >= 0
+    assert committed
+
+  def reset(self):
+    """Forgets the items gotten but not committed, so that they are gotten again."""
+    self.index = 0
+
   def size(self):
     return self.r.llen(self.key) - self.index
 
@@ -58,17 +207,249 @@ class InterprocessQueue:
     self.r.delete(self.key)
 
 
+class StreamQueue:
+  """A queue backed by a redis stream and consumer group.
+
+  StreamQueue supports the same operations as InterprocessQueue. The difference is that
+  the consumer's position is tracked by redis rather than in process memory: items that
+  have been read but not committed stay in the consumer group's pending entries list.
+  So a restarted consumer resumes with its uncommitted items instead of replaying the
+  whole queue, and several consumers (with distinct names) can share one queue.
+  """
+
+  def __init__(self, key, group=DEFAULT_GROUP, consumer=None, claim_idle_ms=CLAIM_IDLE_MS):
+    self.key = key
+    self.group = group
+    self.consumer = consumer or get_default_consumer_name()
+    self.claim_idle_ms = claim_idle_ms
+    self.r = get_redis_client()
+    # The (entry id, value) pairs that have been read but not yet committed, in order.
+    self.in_flight = collections.deque()
+    # Where to resume reading this consumer's pending entries from, or None once
+    # they have all been re-delivered.
+    self.pending_cursor = '0'
+    self.group_created = False
+
+  def _ensure_group(self):
+    if self.group_created:
+      return
+    try:
+      self.r.xgroup_create(self.key, self.group, id='0', mkstream=True)
+    except redis.ResponseError as e:
+      if 'BUSYGROUP' not in str(e):
+        raise
+    self.group_created = True
+
+  def put(self, value):
+    pipe = self.r.pipeline(transaction=False)
+    self.add_put_commands(pipe, [value])
+    entry_id, *unused_results = pipe.execute()
+    return entry_id
+
+  def add_put_commands(self, pipe, values):
+    """Adds the commands for putting values onto this queue to a redis pipeline."""
+    for value in values:
+      pipe.xadd(self.key, {STREAM_FIELD: value})
+    pipe.set(f'{self.key}:latest', values[-1])
+
+  def get(self, timeout=None):
+    """Gets the next item in the queue. Does not remove it from the queue.
+
+    Args:
+      timeout: If None, returns immediately. Otherwise blocks for up to timeout seconds
+        waiting for an item to arrive. A timeout of 0 blocks indefinitely.
+    Returns:
+      The next item in the queue, or None if there is no item available.
+    """
+    values = self.get_batch(1, timeout=timeout)
+    return values[0] if values else None
+
+  def get_batch(self, max_items, timeout=None):
+    """Gets up to max_items next items in the queue. Does not remove them from the queue.
+
+    Items this consumer read but never committed (e.g. before a crash) are returned first,
+    followed by new items. Whenever there are no new items, items abandoned by other
+    consumers are claimed, before waiting for new items.
+    """
+    self._ensure_group()
+    entries = []
+    while self.pending_cursor is not None and not entries:
+      raw_entries = self._read_raw(self.pending_cursor, max_items)
+      if raw_entries:
+        self.pending_cursor = raw_entries[-1][0]
+        entries = self._get_live_entries(raw_entries)
+      else:
+        self.pending_cursor = None
+    if not entries:
+      entries = self._read('>', max_items)
+    if not entries:
+      entries = self._claim_abandoned(max_items)
+    if not entries and timeout is not None:
+      entries = self._read('>', max_items, block=int(timeout * 1000))
+    self.in_flight.extend(entries)
+    return [value for unused_entry_id, value in entries]
+
+  def _read_raw(self, stream_id, count, block=None):
+    response = self.r.xreadgroup(
+        self.group, self.consumer, {self.key: stream_id}, count=count, block=block)
+    if not response:
+      return []
+    unused_key, raw_entries = response[0]
+    return raw_entries
+
+  def _read(self, stream_id, count, block=None):
+    return self._get_live_entries(self._read_raw(stream_id, count, block=block))
+
+  def _get_live_entries(self, raw_entries):
+    """Returns the (entry id, value) of each entry, acknowledging entries since deleted.
+
+    Entries deleted while pending have no fields. They are acknowledged so that they leave
+    the pending entries list, and are not counted by size or delivered again.
+    """
+    entries = []
+    deleted_entry_ids = []
+    for entry_id, fields in raw_entries:
+      if fields:
+        entries.append((entry_id, fields[STREAM_FIELD.encode('utf-8')]))
+      else:
+        deleted_entry_ids.append(entry_id)
+    if deleted_entry_ids:
+      self.r.xack(self.key, self.group, *deleted_entry_ids)
+    return entries
+
+  def _claim_abandoned(self, count):
+    """Takes over entries that another consumer read long ago but never committed.
+
+    This consumer's own pending entries are never claimed, since they are either in flight
+    or re-delivered from the pending entries list.
+    """
+    # This consumer's in-flight entries may be idle too, so look past them.
+    pending = self.r.xpending_range(
+        self.key, self.group, min='-', max='+', count=count + len(self.in_flight),
+        idle=self.claim_idle_ms)
+    consumer = self.consumer.encode('utf-8')
+    entry_ids = [
+        entry['message_id'] for entry in pending
+        if entry['consumer'] != consumer
+    ][:count]
+    if not entry_ids:
+      return []
+    raw_entries = self.r.xclaim(self.key, self.group, self.consumer, self.claim_idle_ms, entry_ids)
+    return self._get_live_entries(raw_entries)
+
+  def peek_all(self):
+    """Returns all items that have not yet been delivered to any consumer in the group."""
+    self._ensure_group()
+    for group_info in self.r.xinfo_groups(self.key):
+      if group_info['name'].decode('utf-8') == self.group:
+        last_delivered_id = group_info['last-delivered-id'].decode('utf-8')
+        break
+    else:
+      last_delivered_id = '0'
+    entries = self.r.xrange(self.key, min=f'({last_delivered_id}')
+    return [fields[STREAM_FIELD.encode('utf-8')] for unused_entry_id, fields in entries]
+
+  def commit(self, value):
+    """Acknowledges the next in-flight item, asserting it matches the provided value.
+
+    See InterprocessQueue.commit for the intended usage pattern.
+    """
+    if value is None:
+      return
+    self.commit_batch([value])
+
+  def commit_batch(self, values):
+    """Acknowledges the next len(values) in-flight items, asserting they match values."""
+    if not values:
+      return
+
+    assert len(values) <= len(self.in_flight)
+    entry_ids = []
+    for value in values:
+      entry_id, expected_value = self.in_flight.popleft()
+      assert value == expected_value
+      entry_ids.append(entry_id)
+
+    # Acknowledged entries are deleted so that the stream does not grow without bound.
+    pipe = self.r.pipeline(transaction=True)
+    pipe.xack(self.key, self.group, *entry_ids)
+    pipe.xdel(self.key, *entry_ids)
+    pipe.execute()
+
+  def reset(self):
+    """Forgets the items read but not committed, so that they are read again.
+
+    They remain in this consumer's pending entries, so they are re-delivered from there.
+    """
+    self.in_flight.clear()
+    self.pending_cursor = '0'
+
+  def size(self):
+    """Returns the number of items not yet delivered to any consumer in the group."""
+    self._ensure_group()
+    pipe = self.r.pipeline(transaction=False)
+    pipe.xlen(self.key)
+    pipe.xpending(self.key, self.group)
+    length, pending = pipe.execute()
+    return length - pending['pending']
+
+  def latest(self):
+    return self.r.get(f'{self.key}:latest')
+
+  def clear(self):
+    self.r.delete(self.key)
+    self.in_flight.clear()
+    self.pending_cursor = '0'
+    self.group_created = False
+
+
+def get_default_consumer_name():
+  # supervisord gives each process a stable name (e.g. GoNoteGo-transcription_01 when running
+  # several), so a restarted process picks up the pending entries of its predecessor.
+  return os.environ.get('SUPERVISOR_PROCESS_NAME', 'default')
+
+
+def make_queue(key):
+  """Makes a queue for key using the backend configured in QUEUE_BACKENDS."""
+  backend = QUEUE_BACKENDS.get(key, LIST_BACKEND)
+  if backend == STREAM_BACKEND:
+    return StreamQueue(key)
+  elif backend == LIST_BACKEND:
+    return InterprocessQueue(key)
+  else:
+    raise ValueError('Unexpected queue backend', key, backend)
+
+
+def put_many(queues, values):
+  """Puts each of the values, in order, onto each of the queues.
+
+  All writes happen in a single MULTI transaction, so this costs one round trip and
+  the queues are updated atomically with respect to one another.
+
+  Args:
+    queues: The InterprocessQueues to write to.
+    values: The values to append to every queue.
+  """
+  if not queues or not values:
+    return
+  r = get_redis_client()
+  with r.pipeline(transaction=True) as pipe:
+    for queue in queues:
+      queue.add_put_commands(pipe, values)
+    pipe.execute()
+
+
 def get_audio_events_queue():
-  return InterprocessQueue('audio_events_queue')
+  return make_queue('audio_events_queue')
 
 
 def get_command_events_queue():
-  return InterprocessQueue('command_events_queue')
+  return make_queue('command_events_queue')
 
 
 def get_note_events_queue():
-  return InterprocessQueue('note_events_queue')
+  return make_queue('note_events_queue')
 
 
 def get_note_events_session_queue():
-  return InterprocessQueue('note_events_session_queue')
+  return make_queue('note_events_session_queue')
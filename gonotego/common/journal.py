@@ -0,0 +1,326 @@
+"""A write-ahead journal of note events, so that notes survive the loss of redis.
+
+Every note event is appended to the journal on disk before it is put on the note events
+queue. If redis loses the queue (e.g. the Pi loses power before redis persists it), the
+uploader rebuilds the queue from the journal when it starts.
+
+The journal is a directory of segment files, each named for the position in the journal
+of its first record. A record is a header holding the length and CRC32 of a note event,
+followed by the note event's bytes, so a record torn by a crash mid-write is detected and
+truncated away before the next append. New records go in the newest segment until it
+exceeds SEGMENT_BYTES.
+
+The index file holds the watermark: the number of records the uploader has uploaded.
+The uploader advances it by matching the note events it commits against the pending
+records, so note events queued before the journal existed never move it. Segments made up
+entirely of uploaded records are deleted as the watermark advances.
+
+Appends are written straight to the operating system, so they survive a crash of the
+process, and a background thread fsyncs them every group_commit_seconds, so they survive
+a loss of power once the next group commit completes. Processes take an exclusive flock
+on the lock file while appending, and keep holding it while putting the note events on
+the queue, so the journal and the queue hold note events in the same order.
+"""
+import collections
+import contextlib
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+
+import fcntl
+import redis
+
+from gonotego.common import interprocess
+
+# Relative to the working directory, like the out/ directory of recordings.
+JOURNAL_DIR = 'journal'
+SEGMENT_BYTES = 1 << 20
+GROUP_COMMIT_SECONDS = 0.2
+SEGMENT_PREFIX = 'segment-'
+SEGMENT_SUFFIX = '.log'
+INDEX_FILENAME = 'index'
+LOCK_FILENAME = 'lock'
+# The length and CRC32 of each record's value.
+RECORD_HEADER = struct.Struct('<II')
+
+_journal = None
+
+
+def get_journal():
+  """Returns the journal shared by everything in this process."""
+  global _journal
+  if _journal is None:
+    _journal = Journal(JOURNAL_DIR)
+  return _journal
+
+
+def put_many(queues, values):
+  """Journals note events and then puts them onto each of the queues.
+
+  Use this in place of interprocess.put_many for anything bound for the note events queue.
+  """
+  j = get_journal()
+  with j.locked():
+    j.append(values)
+    interprocess.put_many(queues, values)
+
+
+def open_shared(path, flags):
+  """Opens a file that every Go Note Go process can write, whichever user runs it."""
+  fd = os.open(path, flags | os.O_CREAT, 0o666)
+  try:
+    os.fchmod(fd, 0o666)
+  except PermissionError:
+    # Created by another user, who already made it shared.
+    pass
+  return fd
+
+
+def encode_record(value):
+  return RECORD_HEADER.pack(len(value), zlib.crc32(value)) + value
+
+
+def scan_records(data):
+  """Returns the values in data up to the first incomplete or corrupt record, and where they end."""
+  values = []
+  offset = 0
+  while offset + RECORD_HEADER.size <= len(data):
+    length, crc = RECORD_HEADER.unpack_from(data, offset)
+    start = offset + RECORD_HEADER.size
+    end = start + length
+    if end > len(data) or zlib.crc32(data[start:end]) != crc:
+      break
+    values.append(data[start:end])
+    offset = end
+  return values, offset
+
+
+def read_records(path):
+  """Returns the values in a segment file, up to the first incomplete or corrupt record."""
+  with open(path, 'rb') as f:
+    values, unused_end = scan_records(f.read())
+  return values
+
+
+class Journal:
+
+  def __init__(self, directory, group_commit_seconds=GROUP_COMMIT_SECONDS):
+    """
+    Args:
+      directory: The directory of the journal's files.
+      group_commit_seconds: How often appends are fsynced. If 0, every append is fsynced
+        before it returns.
+    """
+    self.directory = directory
+    self.group_commit_seconds = group_commit_seconds
+    os.makedirs(directory, exist_ok=True)
+    try:
+      os.chmod(directory, 0o777)
+    except PermissionError:
+      pass
+    self.lock_fd = open_shared(os.path.join(directory, LOCK_FILENAME), os.O_RDWR)
+    # flock does not exclude other threads using the same file descriptor.
+    self.thread_lock = threading.Lock()
+
+    # The segment this process last appended to. Guarded by sync_lock, since the group
+    # commit thread fsyncs it.
+    self.segment_path = None
+    self.segment_fd = None
+    # The size of the segment as of this process's last append, which ends a whole record.
+    self.segment_size = 0
+    self.unsynced = False
+    self.sync_lock = threading.Lock()
+    self.syncer = None
+
+  @contextlib.contextmanager
+  def locked(self):
+    """Holds the journal's lock, excluding every other process and thread."""
+    with self.thread_lock:
+      fcntl.flock(self.lock_fd, fcntl.LOCK_EX)
+      try:
+        yield
+      finally:
+        fcntl.flock(self.lock_fd, fcntl.LOCK_UN)
+
+  def get_segment_path(self, first_position):
+    return os.path.join(self.directory, f'{SEGMENT_PREFIX}{first_position:012d}{SEGMENT_SUFFIX}')
+
+  def segments(self):
+    """Returns the (first position, path) of each segment, in order."""
+    segments = []
+    for filename in os.listdir(self.directory):
+      if filename.startswith(SEGMENT_PREFIX) and filename.endswith(SEGMENT_SUFFIX):
+        first_position = int(filename[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+        segments.append((first_position, os.path.join(self.directory, filename)))
+    return sorted(segments)
+
+  def sync_directory(self):
+    fd = os.open(self.directory, os.O_RDONLY)
+    try:
+      os.fsync(fd)
+    finally:
+      os.close(fd)
+
+  def open_segment(self, path):
+    with self.sync_lock:
+      if self.segment_fd is not None:
+        os.fsync(self.segment_fd)
+        os.close(self.segment_fd)
+      self.segment_fd = open_shared(path, os.O_WRONLY | os.O_APPEND)
+      self.segment_path = path
+      self.unsynced = False
+    self.segment_size = self.truncate_torn_records(0)
+    self.sync_directory()
+
+  def truncate_torn_records(self, offset):
+    """Truncates the segment after its last whole record, and returns its size.
+
+    A process that crashes partway through an append leaves a torn record at the end of the
+    segment. Unless it is removed, the records appended after it could never be read.
+
+    Args:
+      offset: An offset in the segment known to end a whole record, to check from.
+    """
+    with open(self.segment_path, 'rb') as f:
+      f.seek(offset)
+      data = f.read()
+    unused_values, end = scan_records(data)
+    if end < len(data):
+      print(f'Truncating {len(data) - end} bytes of torn records from {self.segment_path}.')
+      os.ftruncate(self.segment_fd, offset + end)
+      os.fsync(self.segment_fd)
+    return offset + end
+
+  def append(self, values):
+    """Appends values to the journal. Call while holding locked()."""
+    segments = self.segments()
+    if not segments:
+      watermark = self.read_watermark()
+      segments = [(watermark, self.get_segment_path(watermark))]
+    first_position, path = segments[-1]
+    if path != self.segment_path:
+      self.open_segment(path)
+    elif os.fstat(self.segment_fd).st_size != self.segment_size:
+      # Another process appended to the segment since, or crashed partway through appending.
+      self.segment_size = self.truncate_torn_records(self.segment_size)
+    if self.segment_size >= SEGMENT_BYTES:
+      # Roll over to a new segment, named for the position of its first record.
+      path = self.get_segment_path(first_position + len(read_records(path)))
+      self.open_segment(path)
+
+    data = b''.join(encode_record(value) for value in values)
+    os.write(self.segment_fd, data)
+    self.segment_size += len(data)
+    if self.group_commit_seconds == 0:
+      os.fsync(self.segment_fd)
+      return
+    with self.sync_lock:
+      self.unsynced = True
+    if self.syncer is None:
+      self.syncer = threading.Thread(target=self.sync_loop, daemon=True)
+      self.syncer.start()
+
+  def sync(self):
+    with self.sync_lock:
+      if self.unsynced:
+        os.fsync(self.segment_fd)
+        self.unsynced = False
+
+  def sync_loop(self):
+    while True:
+      time.sleep(self.group_commit_seconds)
+      self.sync()
+
+  def read_watermark(self):
+    try:
+      with open(os.path.join(self.directory, INDEX_FILENAME), 'r') as f:
+        return json.load(f)['watermark']
+    except FileNotFoundError:
+      return 0
+
+  def write_watermark(self, watermark):
+    path = os.path.join(self.directory, INDEX_FILENAME)
+    temporary_path = f'{path}.tmp'
+    fd = open_shared(temporary_path, os.O_WRONLY | os.O_TRUNC)
+    try:
+      os.write(fd, json.dumps({'watermark': watermark}).encode('utf-8'))
+      os.fsync(fd)
+    finally:
+      os.close(fd)
+    os.replace(temporary_path, path)
+    self.sync_directory()
+
+  def pending(self):
+    """Returns the values not yet uploaded, in order. Call while holding locked()."""
+    watermark = self.read_watermark()
+    values = []
+    for first_position, path in self.segments():
+      records = read_records(path)
+      values.extend(records[max(0, watermark - first_position):])
+    return values
+
+  def advance_watermark(self, values):
+    """Marks values as uploaded, and deletes segments no longer needed.
+
+    values are matched in order against the pending values, so values the journal does not
+    account for (e.g. those queued before the journal existed) do not move the watermark.
+    """
+    if not values:
+      return
+    with self.locked():
+      pending = self.pending()
+      uploaded = 0
+      for value in values:
+        if uploaded < len(pending) and pending[uploaded] == value:
+          uploaded += 1
+      if not uploaded:
+        return
+      watermark = self.read_watermark() + uploaded
+      self.write_watermark(watermark)
+      segments = self.segments()
+      # A segment is no longer needed once the segment after it starts at or before the
+      # watermark. The newest segment is always kept, since it is still being appended to.
+      for (unused_first_position, path), (next_first_position, unused_next_path) in zip(segments, segments[1:]):
+        if next_first_position <= watermark:
+          os.remove(path)
+
+  def recover(self, queue):
+    """Puts the pending values that queue has lost back onto it.
+
+    Call before reading from the queue. Only list queues are recovered. Nothing is removed
+    from the queue: values the journal does not account for (e.g. those queued before the
+    journal existed) are kept, ahead of the pending values, which keep their journal order.
+
+    Returns:
+      The number of values put back on the queue.
+    """
+    if not isinstance(queue, interprocess.InterprocessQueue):
+      print('Only list queues can be recovered from the journal.')
+      return 0
+    with self.locked():
+      values = self.pending()
+      with queue.r.pipeline() as pipe:
+        while True:
+          try:
+            pipe.watch(queue.key)
+            queued_values = pipe.lrange(queue.key, 0, -1)
+            missing = collections.Counter(values)
+            unaccounted_values = []
+            for value in queued_values:
+              if missing[value]:
+                missing[value] -= 1
+              else:
+                unaccounted_values.append(value)
+            missing_count = sum(missing.values())
+            if not missing_count:
+              return 0
+            pipe.multi()
+            pipe.delete(queue.key)
+            queue.add_put_commands(pipe, unaccounted_values + values)
+            pipe.execute()
+            return missing_count
+          except redis.WatchError:
+            continue
@@ -0,0 +1,51 @@
+"""A shared OpenAI client, so that HTTP connections are reused across calls.
+
+Creating an openai.OpenAI client per call discards its connection pool, so every request
+would pay for a new TCP connection and TLS handshake. Instead, each process creates one
+client for the configured OPENAI_API_KEY and reuses it until the setting changes.
+"""
+import contextlib
+import threading
+import time
+
+import httpx
+import openai
+
+from gonotego.settings import settings
+
+# How long an idle connection is kept open for reuse. Notes and commands are often a minute
+# or so apart, so this is longer than httpx's default of five seconds.
+KEEPALIVE_SECONDS = 120
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_client(api_key=None):
+  """Returns the shared client for api_key, which defaults to the OPENAI_API_KEY setting."""
+  api_key = api_key or settings.get('OPENAI_API_KEY')
+  with _lock:
+    client = _clients.get(api_key)
+    if client is None:
+      # The key changed, so clients for the old key will not be used again.
+      # They are not closed here, since another thread may still be using one.
+      _clients.clear()
+      client = openai.OpenAI(
+          api_key=api_key,
+          http_client=openai.DefaultHttpxClient(
+              limits=httpx.Limits(
+                  max_connections=10, max_keepalive_connections=4, keepalive_expiry=KEEPALIVE_SECONDS),
+          ),
+      )
+      _clients[api_key] = client
+  return client
+
+
+@contextlib.contextmanager
+def timed(name):
+  """Prints how long the enclosed OpenAI call took."""
+  start = time.perf_counter()
+  try:
+    yield
+  finally:
+    print(f'OpenAI {name} took {(time.perf_counter() - start) * 1000:.0f}ms')
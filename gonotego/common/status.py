@@ -1,11 +1,24 @@
+"""Status shared between the Go Note Go processes.
+
+All statuses are stored as JSON values in the fields of a single redis hash, so the whole
+snapshot can be read at once with get_all.
+"""
 import ast
 import enum
+import json
 
 from gonotego.common import interprocess
 
 
 STATUS_KEY = 'GoNoteGo:status'
 
+# The value this process last wrote for each status, for skipping repeated writes.
+# Values read are not recorded here, since another process may write the status after the
+# read, and a write skipped on the strength of a stale read would be lost.
+_written_values = {}
+# Whether this process has moved the statuses stored under the old keys into the hash.
+_migrated = False
+
 
 class Status(enum.Enum):
 
@@ -14,6 +27,8 @@ class Status(enum.Enum):
 
   AUDIO_READY = enum.auto()
   AUDIO_RECORDING = enum.auto()
+  AUDIO_OVERFLOWS = enum.auto()
+  AUDIO_UNDERRUNS = enum.auto()
   TEXT_READY = enum.auto()
   TEXT_LAST_KEYPRESS = enum.auto()
   TRANSCRIPTION_READY = enum.auto()
@@ -24,22 +39,63 @@ class Status(enum.Enum):
   VOLUME_SETTING = enum.auto()
 
 
-def get_redis_key(key):
+# Statuses written by more than one process. These are always written, since another
+# process may have changed them since this process last wrote them.
+SHARED_STATUSES = (Status.INTERNET_AVAILABLE, Status.VOLUME_SETTING)
+
+
+def decode(value_bytes):
+  if value_bytes is None:
+    return None
+  return json.loads(value_bytes)
+
+
+def get_legacy_key(key):
+  """Returns the key each status was stored under, as a repr, before they shared a hash."""
   return f'{STATUS_KEY}:{key.name}'
 
 
+def migrate_legacy_keys():
+  """Moves statuses from their old keys into the hash, without overwriting newer values.
+
+  Most statuses are rewritten when the processes start, but VOLUME_SETTING is only ever set
+  by the user, so it would otherwise be lost on upgrade.
+  """
+  global _migrated
+  if _migrated:
+    return
+  r = interprocess.get_redis_client()
+  legacy_keys = [get_legacy_key(key) for key in Status]
+  pipe = r.pipeline(transaction=True)
+  for key, value_bytes in zip(Status, r.mget(legacy_keys)):
+    if value_bytes is not None:
+      value = ast.literal_eval(value_bytes.decode('utf-8'))
+      pipe.hsetnx(STATUS_KEY, key.name, json.dumps(value))
+  pipe.delete(*legacy_keys)
+  pipe.execute()
+  _migrated = True
+
+
 def get(key):
+  migrate_legacy_keys()
   r = interprocess.get_redis_client()
-  value_bytes = r.get(get_redis_key(key))
-  if value_bytes is None:
-    return None
-  value_repr = value_bytes.decode('utf-8')
-  value = ast.literal_eval(value_repr)
-  return value
+  return decode(r.hget(STATUS_KEY, key.name))
+
+
+def get_all():
+  """Returns the value of every status, as a dict from Status to value."""
+  migrate_legacy_keys()
+  r = interprocess.get_redis_client()
+  fields = r.hgetall(STATUS_KEY)
+  snapshot = {}
+  for key in Status:
+    snapshot[key] = decode(fields.get(key.name.encode('utf-8')))
+  return snapshot
 
 
 def set(key, value):
+  if key not in SHARED_STATUSES and key in _written_values and _written_values[key] == value and type(_written_values[key]) is type(value):
+    return
   r = interprocess.get_redis_client()
-  value_repr = repr(value)
-  value_bytes = value_repr.encode('utf-8')
-  r.set(get_redis_key(key), value_bytes)
+  r.hset(STATUS_KEY, key.name, json.dumps(value))
+  _written_values[key] = value
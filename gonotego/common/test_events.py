@@ -29,6 +29,55 @@ class EventsTest(unittest.TestCase):
     event2 = events.NoteEvent.from_bytes(event_bytes)
     self.assertEqual(event, event2)
 
+  def test_note_event_all_fields(self):
+    event = events.NoteEvent(
+        text='Café ☕ note.',
+        action=events.SUBMIT,
+        audio_filepath='out/20240101-1704067200000.wav',
+        timestamp=1704067200.123456)
+    event_bytes = bytes(event)
+    event2 = events.NoteEvent.from_bytes(event_bytes)
+    self.assertEqual(event, event2)
+
+  def test_note_event_empty_text(self):
+    event = events.NoteEvent(
+        text='',
+        action=events.SUBMIT,
+        audio_filepath=None,
+        timestamp=0.0)
+    event_bytes = bytes(event)
+    event2 = events.NoteEvent.from_bytes(event_bytes)
+    self.assertEqual(event, event2)
+
+  def test_note_event_from_json(self):
+    # NoteEvents queued by earlier versions are JSON encoded.
+    event_bytes = b'{"text": "Example note.", "action": "submit", "audio_filepath": null, "timestamp": 1704067200.5}'
+    event = events.NoteEvent.from_bytes(event_bytes)
+    self.assertEqual(event, events.NoteEvent(
+        text='Example note.',
+        action=events.SUBMIT,
+        audio_filepath=None,
+        timestamp=1704067200.5))
+
+  def test_note_event_lazy(self):
+    event = events.NoteEvent(
+        text='Example note.',
+        action=events.SUBMIT,
+        audio_filepath=None,
+        timestamp=1704067200.5)
+    lazy_event = events.NoteEvent.lazy_from_bytes(bytes(event))
+    self.assertEqual(lazy_event.action, events.SUBMIT)
+    self.assertEqual(lazy_event.text, 'Example note.')
+    self.assertIsNone(lazy_event.audio_filepath)
+    # Decoded fields are kept rather than decoded again.
+    self.assertIs(lazy_event.text, lazy_event.text)
+    self.assertEqual(lazy_event.to_note_event(), event)
+    self.assertEqual(bytes(lazy_event), bytes(event))
+
+  def test_events_are_slotted(self):
+    event = events.NoteEvent('Example note.', events.SUBMIT, None, None)
+    self.assertFalse(hasattr(event, '__dict__'))
+
   def test_led_event(self):
     event = events.LEDEvent(
         color=[0, 0, 0],
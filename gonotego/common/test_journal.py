@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+
+from gonotego.common import journal
+
+
+class JournalTest(unittest.TestCase):
+
+  def setUp(self):
+    self.directory = tempfile.TemporaryDirectory()
+    self.journal = journal.Journal(self.directory.name, group_commit_seconds=0)
+
+  def tearDown(self):
+    self.directory.cleanup()
+
+  def append(self, values):
+    with self.journal.locked():
+      self.journal.append(values)
+
+  def pending(self):
+    with self.journal.locked():
+      return self.journal.pending()
+
+  def test_append_and_advance_watermark(self):
+    self.append([b'a', b'b'])
+    self.append([b'c'])
+    self.assertEqual(self.pending(), [b'a', b'b', b'c'])
+    self.journal.advance_watermark([b'a', b'b'])
+    self.assertEqual(self.pending(), [b'c'])
+
+  def test_unjournaled_values_do_not_advance_watermark(self):
+    self.append([b'a', b'b'])
+    self.journal.advance_watermark([b'legacy', b'a', b'legacy'])
+    self.assertEqual(self.pending(), [b'b'])
+
+  def test_torn_record_is_ignored(self):
+    self.append([b'a', b'b'])
+    (unused_first_position, path), = self.journal.segments()
+    with open(path, 'ab') as f:
+      f.write(journal.encode_record(b'torn')[:-1])
+    self.assertEqual(self.pending(), [b'a', b'b'])
+
+  def test_append_after_torn_record(self):
+    self.append([b'a'])
+    (unused_first_position, path), = self.journal.segments()
+    # Another process crashes partway through an append.
+    with open(path, 'ab') as f:
+      f.write(journal.encode_record(b'torn')[:-1])
+    self.append([b'b'])
+    # This process restarts after crashing partway through an append.
+    with open(path, 'ab') as f:
+      f.write(journal.encode_record(b'torn')[:3])
+    self.journal = journal.Journal(self.directory.name, group_commit_seconds=0)
+    self.append([b'c'])
+    self.assertEqual(self.pending(), [b'a', b'b', b'c'])
+
+  def test_segments_roll_over_and_are_deleted(self):
+    value = b'x' * (journal.SEGMENT_BYTES // 2)
+    self.append([value] * 3)
+    self.append([value])
+    self.append([value])
+    self.assertEqual([first for first, unused_path in self.journal.segments()], [0, 3])
+    self.journal.advance_watermark([value] * 2)
+    self.assertEqual([first for first, unused_path in self.journal.segments()], [0, 3])
+    self.journal.advance_watermark([value])
+    self.assertEqual([first for first, unused_path in self.journal.segments()], [3])
+    self.assertEqual(self.pending(), [value, value])
+    self.assertEqual(os.path.basename(self.journal.segments()[0][1]), 'segment-000000000003.log')
+
+
+if __name__ == '__main__':
+  unittest.main()
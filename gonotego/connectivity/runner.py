@@ -0,0 +1,10 @@
+from gonotego.common import internet
+
+
+def main():
+  print('Starting connectivity monitor.')
+  internet.monitor()
+
+
+if __name__ == '__main__':
+  main()
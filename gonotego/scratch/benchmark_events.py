@@ -0,0 +1,57 @@
+"""Compares NoteEvent encode/decode throughput and size against the earlier JSON format.
+
+Usage:
+  python gonotego/scratch/benchmark_events.py compare --n=100000
+"""
+import dataclasses
+import json
+import time
+
+import fire
+
+from gonotego.common import events
+
+
+def json_encode(note_event):
+  # The encoding used by earlier versions of NoteEvent.__bytes__.
+  return json.dumps(dataclasses.asdict(note_event)).encode('utf-8')
+
+
+def json_decode(b):
+  return events.NoteEvent(**json.loads(b.decode('utf-8')))
+
+
+def lazy_decode_action(b):
+  return events.NoteEvent.lazy_from_bytes(b).action
+
+
+def make_note_event():
+  return events.NoteEvent(
+      text='Remember to pick up more batteries for the headlamp before the trip.',
+      action=events.SUBMIT,
+      audio_filepath='out/20240101-1704067200000.wav',
+      timestamp=time.time())
+
+
+def throughput(func, arg, n):
+  start = time.perf_counter()
+  for _ in range(n):
+    func(arg)
+  return n / (time.perf_counter() - start)
+
+
+def compare(n=100000):
+  note_event = make_note_event()
+  json_bytes = json_encode(note_event)
+  binary_bytes = bytes(note_event)
+
+  print(f'Size: json {len(json_bytes)} bytes, binary {len(binary_bytes)} bytes')
+  print(f'Encode: json {throughput(json_encode, note_event, n):,.0f}/s, '
+        f'binary {throughput(bytes, note_event, n):,.0f}/s')
+  print(f'Decode: json {throughput(json_decode, json_bytes, n):,.0f}/s, '
+        f'binary {throughput(events.NoteEvent.from_bytes, binary_bytes, n):,.0f}/s')
+  print(f'Decode action only: binary (lazy) {throughput(lazy_decode_action, binary_bytes, n):,.0f}/s')
+
+
+if __name__ == '__main__':
+  fire.Fire()
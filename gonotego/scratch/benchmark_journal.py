@@ -0,0 +1,49 @@
+"""Benchmarks the journal's append throughput against its group commit interval.
+
+Appends note events one at a time, as the shell does, to a temporary journal for each
+group commit interval. A longer interval fsyncs less often, so appends are faster, but a
+loss of power can lose the appends since the last group commit. The records at risk are
+the appends made in one interval at the measured throughput.
+
+Usage:
+  python gonotego/scratch/benchmark_journal.py run
+  python gonotego/scratch/benchmark_journal.py run --count=5000 --intervals="[0, 0.1, 1]"
+"""
+import tempfile
+import time
+
+import fire
+
+from gonotego.common import events
+from gonotego.common import journal
+
+# 0 fsyncs every append before it returns.
+INTERVALS = (0, 0.01, 0.05, 0.2, 1.0)
+
+
+def run(count=2000, intervals=INTERVALS, text='The quick brown fox jumps over the lazy dog.'):
+  note_event = events.NoteEvent(
+      text=text,
+      action=events.SUBMIT,
+      audio_filepath=None,
+      timestamp=time.time())
+  value = bytes(note_event)
+
+  for interval in intervals:
+    with tempfile.TemporaryDirectory() as directory:
+      j = journal.Journal(directory, group_commit_seconds=interval)
+      start = time.perf_counter()
+      for _ in range(count):
+        with j.locked():
+          j.append([value])
+      elapsed = time.perf_counter() - start
+      j.sync()
+
+    throughput = count / elapsed
+    at_risk = 'none' if interval == 0 else f'{throughput * interval:.0f}'
+    print(f'Group commit every {interval}s: {throughput:.0f} appends/s, '
+          f'{elapsed / count * 1e6:.1f}us per append, records at risk: {at_risk}')
+
+
+if __name__ == '__main__':
+  fire.Fire()
@@ -0,0 +1,42 @@
+"""Measures the per-call latency of the redis operations used by status and settings.
+
+Run on the device with redis running, e.g.:
+  python gonotego/scratch/benchmark_redis.py compare --n=1000
+"""
+import time
+
+import fire
+import redis
+
+from gonotego.common import interprocess
+
+BENCHMARK_KEY = 'GoNoteGo:benchmark'
+
+
+def fresh_client():
+  # How every call site obtained a client before the shared pool.
+  return redis.Redis(host=interprocess.REDIS_HOST, port=interprocess.REDIS_PORT, db=interprocess.REDIS_DB)
+
+
+def time_calls(make_client, n):
+  start = time.perf_counter()
+  for i in range(n):
+    r = make_client()
+    r.set(BENCHMARK_KEY, repr(i))
+    r.get(BENCHMARK_KEY)
+  elapsed = time.perf_counter() - start
+  # Each iteration performs two calls.
+  return elapsed / (2 * n)
+
+
+def compare(n=1000):
+  fresh = time_calls(fresh_client, n)
+  pooled = time_calls(interprocess.get_redis_client, n)
+  transport = 'unix socket' if interprocess.make_connection_pool().connection_class is redis.UnixDomainSocketConnection else 'tcp'
+  print(f'Fresh client per call: {fresh * 1e6:.1f} us/call')
+  print(f'Shared pooled client ({transport}): {pooled * 1e6:.1f} us/call')
+  interprocess.get_redis_client().delete(BENCHMARK_KEY)
+
+
+if __name__ == '__main__':
+  fire.Fire()
@@ -0,0 +1,51 @@
+"""Benchmarks the latency from a key event to the shell's text buffer.
+
+Types text into a Shell as synthetic key down and up events, without submitting it,
+and reports how long the shell takes to handle each keypress.
+
+Usage:
+  python gonotego/scratch/benchmark_shell.py run
+  python gonotego/scratch/benchmark_shell.py run --text="Hello, world." --repeats=100
+"""
+import time
+
+import fire
+import keyboard
+
+from gonotego.text import shell
+
+DEFAULT_TEXT = 'The quick brown fox jumps over the lazy dog. '
+
+
+def make_events(text):
+  key_events = []
+  for character in text:
+    name = 'space' if character == ' ' else character.lower()
+    if character.isupper():
+      key_events.append(keyboard.KeyboardEvent(keyboard.KEY_DOWN, 42, 'shift'))
+    key_events.append(keyboard.KeyboardEvent(keyboard.KEY_DOWN, 0, name))
+    key_events.append(keyboard.KeyboardEvent(keyboard.KEY_UP, 0, name))
+    if character.isupper():
+      key_events.append(keyboard.KeyboardEvent(keyboard.KEY_UP, 42, 'shift'))
+  return key_events
+
+
+def run(text=DEFAULT_TEXT, repeats=20):
+  s = shell.Shell()
+  key_events = make_events(text) * repeats
+  latencies = []
+  for event in key_events:
+    start = time.perf_counter()
+    s.on_event(event)
+    if event.event_type == keyboard.KEY_DOWN:
+      latencies.append(time.perf_counter() - start)
+
+  latencies.sort()
+  mean = sum(latencies) / len(latencies)
+  p99 = latencies[int(0.99 * (len(latencies) - 1))]
+  print(f'{len(latencies)} keypresses, {len(s.buffer)} characters in the buffer')
+  print(f'Keypress to buffer: mean {mean * 1e6:.1f}us, p99 {p99 * 1e6:.1f}us, max {latencies[-1] * 1e6:.1f}us')
+
+
+if __name__ == '__main__':
+  fire.Fire()
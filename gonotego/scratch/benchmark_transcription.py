@@ -0,0 +1,43 @@
+"""Benchmarks the real-time factor of each transcription backend.
+
+A real-time factor below 1 means a backend transcribes faster than the audio plays.
+
+Usage:
+  python gonotego/scratch/benchmark_transcription.py run out/*.wav
+  python gonotego/scratch/benchmark_transcription.py run out/*.wav --backends=vosk,whispercpp
+"""
+import time
+
+import fire
+import soundfile as sf
+
+from gonotego.transcription import transcriber
+
+BACKENDS = ('openai', 'vosk', 'whispercpp')
+
+
+def run(*filepaths, backends=BACKENDS):
+  if isinstance(backends, str):
+    backends = backends.split(',')
+  audio_seconds = sum(sf.info(filepath).duration for filepath in filepaths)
+  for backend in backends:
+    try:
+      t = transcriber.make_transcriber(backend)
+      # Transcribe once untimed, so that model loading is not counted.
+      # The cache is bypassed throughout, so that every transcription is timed.
+      t.transcribe_uncached(filepaths[0])
+    except Exception as e:
+      print(f'{backend}: unavailable. {repr(e)}')
+      continue
+
+    start = time.perf_counter()
+    for filepath in filepaths:
+      transcript = t.transcribe_uncached(filepath)
+      print(f'{t.name} {filepath}: {transcript}')
+    processing_seconds = time.perf_counter() - start
+    print(f'{t.name}: {audio_seconds:.1f}s audio transcribed in {processing_seconds:.1f}s. '
+          f'Real-time factor: {processing_seconds / audio_seconds:.3f}')
+
+
+if __name__ == '__main__':
+  fire.Fire()
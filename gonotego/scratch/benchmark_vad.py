@@ -0,0 +1,41 @@
+"""Benchmarks voice activity detection over recordings.
+
+Usage:
+  python gonotego/scratch/benchmark_vad.py run out/*.wav
+"""
+import time
+
+import fire
+import soundfile as sf
+
+from gonotego.audio import audiolistener
+from gonotego.audio import vad
+
+
+def run(*filepaths):
+  total_audio_seconds = 0
+  total_processing_seconds = 0
+  for filepath in filepaths:
+    samples, samplerate = sf.read(filepath, dtype='float32')
+    audio_seconds = len(samples) / samplerate
+
+    # Process in the same block size that the AudioListener uses while recording.
+    detector = vad.VoiceActivityDetector(samplerate)
+    start = time.perf_counter()
+    for i in range(0, len(samples), audiolistener.BLOCKSIZE):
+      detector.process(samples[i:i + audiolistener.BLOCKSIZE])
+    processing_seconds = time.perf_counter() - start
+
+    total_audio_seconds += audio_seconds
+    total_processing_seconds += processing_seconds
+    speech_seconds = sum(end - start for start, end in detector.segments())
+    print(f'{filepath}: {audio_seconds:.1f}s audio, {speech_seconds:.1f}s speech '
+          f'in {len(detector.segments())} segments, trailing silence {detector.silence_length():.1f}s, '
+          f'processed in {processing_seconds * 1000:.1f}ms')
+
+  if total_audio_seconds:
+    print(f'Real-time factor: {total_processing_seconds / total_audio_seconds:.5f}')
+
+
+if __name__ == '__main__':
+  fire.Fire()
@@ -2,6 +2,7 @@ import fire
 
 from gonotego.common import events
 from gonotego.common import interprocess
+from gonotego.common import journal
 from gonotego.common import status
 
 
@@ -9,7 +10,7 @@ def insert(text='test transcript', filepath=None):
   filepath = filepath or 'out/20210920-1632188898638.wav'
   note_events_queue = interprocess.get_note_events_queue()
   note_event = events.NoteEvent(text, filepath)
-  note_events_queue.put(bytes(note_event))
+  journal.put_many([note_events_queue], [bytes(note_event)])
   print(note_events_queue.size())
   return 'Success'
 
@@ -29,8 +30,8 @@ def size():
 
 
 def get_status():
-  for key in list(status.Status):
-    print(key, status.get(key))
+  for key, value in status.get_all().items():
+    print(key, value)
 
 
 if __name__ == '__main__':
@@ -36,5 +36,13 @@ DROPBOX_ACCESS_TOKEN = '<DROPBOX_ACCESS_TOKEN>'
 
 OPENAI_API_KEY = '<OPENAI_API_KEY>'
 
+AUDIO_FORMAT = '<AUDIO_FORMAT>'
+TRANSCRIPTION_BACKEND = '<TRANSCRIPTION_BACKEND>'
+VOSK_MODEL_PATH = '<VOSK_MODEL_PATH>'
+WHISPER_CPP_BINARY = '<WHISPER_CPP_BINARY>'
+WHISPER_CPP_MODEL_PATH = '<WHISPER_CPP_MODEL_PATH>'
+TRANSCRIPTION_WORKERS = '<TRANSCRIPTION_WORKERS>'
+TRANSCRIPTION_MAX_IN_FLIGHT = '<TRANSCRIPTION_MAX_IN_FLIGHT>'
+
 WIFI_NETWORKS = []
 CUSTOM_COMMAND_PATHS = []
@@ -5,42 +5,152 @@ Run ":clear all" to clear settings set on Go Note Go, reverting back to those se
 in secure_settings.py.
 Run ":clear KEY" to clear an individual setting on Go Note Go, reverting it back
 to its value from secure_settings.py.
+
+Each process caches the settings it reads, already parsed. set, clear, and clear_all
+announce the change on SETTINGS_CHANNEL, and a listener thread in every process that
+has read a setting drops the changed entries from its cache.
 """
 import ast
+import copy
+import threading
+
 from gonotego.settings import secure_settings
 from gonotego.common import interprocess
 
 SETTINGS_KEY = 'GoNoteGo:settings'
+# Carries the key of each setting that changes, or ALL_KEYS when every setting is cleared.
+SETTINGS_CHANNEL = 'GoNoteGo:settings_changed'
+ALL_KEYS = '*'
+
+# Marks settings that are not set in redis, and so come from secure_settings.
+_UNSET = object()
+_NOT_CACHED = object()
+
+_cache = {}
+# Incremented on every invalidation, so that a value read from redis is not cached
+# if the setting changed while it was being read.
+_generation = 0
+_listening = False
+_lock = threading.Lock()
 
 
 def get_redis_key(key):
   return f'{SETTINGS_KEY}:{key}'
 
 
-def get(key):
+def _listen(pubsub):
+  global _listening
+  try:
+    for message in pubsub.listen():
+      if message['type'] == 'message':
+        _invalidate(message['data'].decode('utf-8'))
+  except Exception as e:
+    print(f'Settings listener stopped. {repr(e)}')
+  finally:
+    # Without the listener, changes from other processes would go unseen, so stop caching.
+    with _lock:
+      _listening = False
+    _invalidate(ALL_KEYS)
+    pubsub.close()
+
+
+def _start_listening():
+  """Starts the invalidation listener. Returns whether it is running."""
+  global _listening
+  with _lock:
+    if _listening:
+      return True
+    try:
+      pubsub = interprocess.get_redis_client().pubsub()
+      pubsub.subscribe(SETTINGS_CHANNEL)
+      # Wait for the subscription to be confirmed, so that no later change is missed.
+      if pubsub.get_message(timeout=1) is None:
+        pubsub.close()
+        return False
+    except Exception as e:
+      print(f'Failed to listen for settings changes. {repr(e)}')
+      return False
+    _listening = True
+  threading.Thread(target=_listen, args=(pubsub,), daemon=True).start()
+  return True
+
+
+def _invalidate(key):
+  global _generation
+  with _lock:
+    _generation += 1
+    if key == ALL_KEYS:
+      _cache.clear()
+    else:
+      _cache.pop(key, None)
+
+
+def _read(key):
+  """Reads a setting from redis, returning _UNSET if it is not set there."""
   r = interprocess.get_redis_client()
   value_bytes = r.get(get_redis_key(key))
   if value_bytes is None:
+    return _UNSET
+  value_repr = value_bytes.decode('utf-8')
+  return ast.literal_eval(value_repr)
+
+
+def get(key):
+  value = _cache.get(key, _NOT_CACHED)
+  if value is _NOT_CACHED:
+    caching = _start_listening()
+    generation = _generation
+    value = _read(key)
+    if caching:
+      with _lock:
+        if _generation == generation and _listening:
+          _cache[key] = value
+
+  if value is _UNSET:
     # If the setting isn't set in redis, fall back to the value from secure_settings.
     return getattr(secure_settings, key)
-  value_repr = value_bytes.decode('utf-8')
-  value = ast.literal_eval(value_repr)
+  # Copied so that callers cannot modify the cached value.
+  return copy.deepcopy(value)
+
+
+def get_or_default(key, default):
+  """Gets a setting, or default if it is not configured.
+
+  A setting is not configured if it is missing from secure_settings (e.g. a secure_settings.py
+  made from an older template) or still holds its template placeholder, e.g. '<KEY>'.
+  """
+  try:
+    value = get(key)
+  except AttributeError:
+    return default
+  if value == f'<{key}>' or value == '':
+    return default
   return value
 
 
+def _publish_change(key):
+  r = interprocess.get_redis_client()
+  r.publish(SETTINGS_CHANNEL, key.encode('utf-8'))
+  # Don't wait for the listener to hear about changes made by this process.
+  _invalidate(key)
+
+
 def set(key, value):
   r = interprocess.get_redis_client()
   value_repr = repr(value)
   value_bytes = value_repr.encode('utf-8')
   r.set(get_redis_key(key), value_bytes)
+  _publish_change(key)
 
 
 def clear(key):
   r = interprocess.get_redis_client()
   r.delete(get_redis_key(key))
+  _publish_change(key)
 
 
 def clear_all():
   r = interprocess.get_redis_client()
   for key in r.keys(get_redis_key('*')):
     r.delete(key)
+  _publish_change(ALL_KEYS)
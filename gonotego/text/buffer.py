@@ -0,0 +1,84 @@
+"""The text buffer of the shell.
+
+The buffer is a gap buffer made of two lists of characters: the characters before the
+cursor, in order, and the characters after the cursor, in reverse order. The cursor sits
+in the gap between them. Typing and deleting at the cursor, and moving the cursor by one
+character, each append to or pop from the end of a list, so they take O(1) amortized time
+however long the text is. The text is only joined into a string when it is needed.
+"""
+
+
+class TextBuffer:
+
+  def __init__(self, text=''):
+    self.before = list(text)
+    # Reversed, so that the characters nearest the cursor are at the end.
+    self.after = []
+
+  def __str__(self):
+    return ''.join(self.before) + ''.join(reversed(self.after))
+
+  def __len__(self):
+    return len(self.before) + len(self.after)
+
+  def __bool__(self):
+    return bool(self.before or self.after)
+
+  @property
+  def cursor(self):
+    return len(self.before)
+
+  def insert(self, text):
+    """Inserts text at the cursor, leaving the cursor after it."""
+    self.before.extend(text)
+
+  def backspace(self):
+    """Deletes the character before the cursor."""
+    if self.before:
+      self.before.pop()
+
+  def delete(self):
+    """Deletes the character after the cursor."""
+    if self.after:
+      self.after.pop()
+
+  def delete_word(self):
+    """Deletes the word before the cursor, along with any whitespace after it."""
+    while self.before and self.before[-1].isspace():
+      self.before.pop()
+    while self.before and not self.before[-1].isspace():
+      self.before.pop()
+
+  def clear(self):
+    self.before = []
+    self.after = []
+
+  def move_left(self):
+    if self.before:
+      self.after.append(self.before.pop())
+
+  def move_right(self):
+    if self.after:
+      self.before.append(self.after.pop())
+
+  def move_word_left(self):
+    """Moves the cursor to the start of the word before it."""
+    while self.before and self.before[-1].isspace():
+      self.move_left()
+    while self.before and not self.before[-1].isspace():
+      self.move_left()
+
+  def move_word_right(self):
+    """Moves the cursor to the end of the word after it."""
+    while self.after and self.after[-1].isspace():
+      self.move_right()
+    while self.after and not self.after[-1].isspace():
+      self.move_right()
+
+  def move_home(self):
+    self.after.extend(reversed(self.before))
+    self.before = []
+
+  def move_end(self):
+    self.before.extend(reversed(self.after))
+    self.after = []
@@ -8,14 +8,25 @@ import time
 
 from gonotego.common import events
 from gonotego.common import interprocess
+from gonotego.common import journal
 from gonotego.common import status
 from gonotego.settings import settings
+from gonotego.text import buffer
 
 Status = status.Status
 
 MINUS = chr(8722)
 assert MINUS == '−'  # This is a unicode minus sign, not an ordinary hyphen.
 MAC_LEFT_SHIFT = 56
+SHIFT_KEYS = ('shift', 'left shift', 'right shift')
+CMD_KEYS = ('cmd', 'command')
+# Held with backspace or an arrow key to act on a whole word.
+WORD_KEYS = ('ctrl', 'right ctrl', 'alt', 'right alt', 'option', 'right option')
+# How often the last keypress time is written to status, and HOTKEY is reread.
+# Keypresses themselves do no I/O.
+FLUSH_SECONDS = 1
+# Submit the buffer as a note after this long without a keypress.
+INACTIVITY_SECONDS = 180
 
 shift_characters = {
     '1': '!',
@@ -51,48 +62,99 @@ def get_timestamp():
   return time.time()
 
 
-def is_shift_pressed():
-  if keyboard.is_pressed('shift') or keyboard.is_pressed('right shift'):
-    return True
-  if platform.system() == 'Darwin':
-    if keyboard.is_pressed(MAC_LEFT_SHIFT):
-      return True
-  return False
-
-
 class Shell:
 
   def __init__(self):
     self.command_event_queue = interprocess.get_command_events_queue()
     self.note_events_queue = interprocess.get_note_events_queue()
     self.note_events_session_queue = interprocess.get_note_events_session_queue()
-    self.text = ''
+    self.buffer = buffer.TextBuffer()
     self.last_press = None
+    self.last_press_flushed = None
+    # The names and scan codes of the keys currently held down, tracked from key events.
+    self.pressed_names = set()
+    self.pressed_scan_codes = set()
+    # The HOTKEY setting, and the scan codes of its keys. See load_hotkey.
+    self.hotkey_setting = None
+    self.hotkey = None
+    self.load_hotkey()
+
+  def put_note_event(self, note_event):
+    # Journals the event, then writes it to both note queues in a single round trip.
+    journal.put_many(
+        [self.note_events_queue, self.note_events_session_queue],
+        [bytes(note_event)])
 
   def start(self):
-    keyboard.on_press(self.on_press)
+    keyboard.hook(self.on_event)
+
+  def load_hotkey(self):
+    # HOTKEY may be a combination of keys, e.g. 'ctrl+space'. It is resolved to scan codes
+    # as keyboard.is_pressed resolves it for the audio trigger, so aliases (e.g. 'control')
+    # and either side's modifier (e.g. right ctrl for 'ctrl') match here too.
+    hotkey_setting = settings.get_or_default('HOTKEY', None)
+    if hotkey_setting == self.hotkey_setting:
+      return
+    self.hotkey_setting = hotkey_setting
+    self.hotkey = None
+    if not hotkey_setting:
+      return
+    try:
+      steps = keyboard.parse_hotkey(hotkey_setting)
+    except Exception as e:
+      # As in the audio trigger, an invalid HOTKEY never triggers.
+      print(f'Invalid HOTKEY {hotkey_setting}: {repr(e)}')
+      return
+    if len(steps) != 1:
+      print(f'HOTKEY {hotkey_setting} must be a single combination of keys.')
+      return
+    # For each key of the hotkey, the scan codes that any of its names map to.
+    self.hotkey = steps[0]
+
+  def on_event(self, event):
+    name = event.name.lower() if event.name else None
+    if event.event_type == keyboard.KEY_UP:
+      self.pressed_names.discard(name)
+      self.pressed_scan_codes.discard(event.scan_code)
+      return
+    self.pressed_names.add(name)
+    self.pressed_scan_codes.add(event.scan_code)
+    self.on_press(event)
+
+  def is_pressed(self, name):
+    return name in self.pressed_names
+
+  def is_shift_pressed(self):
+    if any(self.is_pressed(name) for name in SHIFT_KEYS):
+      return True
+    if platform.system() == 'Darwin':
+      if MAC_LEFT_SHIFT in self.pressed_scan_codes:
+        return True
+    return False
+
+  def is_word_modifier_pressed(self):
+    return any(self.is_pressed(name) for name in WORD_KEYS)
+
+  def is_hotkey_pressed(self):
+    return bool(self.hotkey) and all(
+        any(scan_code in self.pressed_scan_codes for scan_code in scan_codes)
+        for scan_codes in self.hotkey)
 
   def on_press(self, event):
     self.last_press = time.time()
-    status.set(Status.TEXT_LAST_KEYPRESS, self.last_press)
-    try:
-      if keyboard.is_pressed(settings.get('HOTKEY')):
-        # Ignore presses while the hotkey is pressed.
-        return
-    except ValueError:
-      # If HOTKEY is not a valid key, continue.
-      pass
+    if self.is_hotkey_pressed():
+      # Ignore presses while the hotkey is pressed.
+      return
 
     if event.name == 'tab':
-      if is_shift_pressed():
+      if self.is_shift_pressed():
         # Shift-Tab
         note_event = events.NoteEvent(
             text=None,
             action=events.UNINDENT,
             audio_filepath=None,
             timestamp=get_timestamp())
-        self.note_events_queue.put(bytes(note_event))
-        self.note_events_session_queue.put(bytes(note_event))
+        self.put_note_event(note_event)
       else:
         # Tab
         note_event = events.NoteEvent(
@@ -100,74 +162,93 @@ class Shell:
             action=events.INDENT,
             audio_filepath=None,
             timestamp=get_timestamp())
-        self.note_events_queue.put(bytes(note_event))
-        self.note_events_session_queue.put(bytes(note_event))
+        self.put_note_event(note_event)
     elif event.name == 'delete' or event.name == 'backspace':
-      if self.text == '':
+      if not self.buffer:
         note_event = events.NoteEvent(
             text=None,
             action=events.CLEAR_EMPTY,
             audio_filepath=None,
             timestamp=get_timestamp())
-        self.note_events_queue.put(bytes(note_event))
-        self.note_events_session_queue.put(bytes(note_event))
-      self.text = self.text[:-1]
-      if is_shift_pressed():
-        self.text = ''
-    elif event.name == 'v' and keyboard.is_pressed('cmd'):
+        self.put_note_event(note_event)
+      if self.is_shift_pressed():
+        self.buffer.clear()
+      elif event.name == 'delete' and platform.system() != 'Darwin':
+        # Forward delete. On a Mac, the key labeled delete is backspace.
+        self.buffer.delete()
+      elif self.is_word_modifier_pressed():
+        self.buffer.delete_word()
+      else:
+        self.buffer.backspace()
+    elif event.name == 'left':
+      if self.is_word_modifier_pressed():
+        self.buffer.move_word_left()
+      else:
+        self.buffer.move_left()
+    elif event.name == 'right':
+      if self.is_word_modifier_pressed():
+        self.buffer.move_word_right()
+      else:
+        self.buffer.move_right()
+    elif event.name in ('home', 'up'):
+      self.buffer.move_home()
+    elif event.name in ('end', 'down'):
+      self.buffer.move_end()
+    elif event.name == 'v' and any(self.is_pressed(name) for name in CMD_KEYS):
       # If on Mac, paste into the buffer.
       if platform.system() == 'Darwin':
         clipboard = pyperclip.paste()
-        self.text += clipboard
+        self.buffer.insert(clipboard)
     elif event.name == 'enter':
-      if is_shift_pressed():
+      if self.is_shift_pressed():
         note_event = events.NoteEvent(
             text=None,
             action=events.END_SESSION,
             audio_filepath=None,
             timestamp=get_timestamp())
-        self.note_events_queue.put(bytes(note_event))
+        journal.put_many([self.note_events_queue], [bytes(note_event)])
         self.note_events_session_queue.clear()
       # Write both a text event (for the command center)
       # and a note event (for the uploader).
-      if self.text == '':
+      text = str(self.buffer)
+      if text == '':
         note_event = events.NoteEvent(
             text=None,
             action=events.ENTER_EMPTY,
             audio_filepath=None,
             timestamp=get_timestamp())
-        self.note_events_queue.put(bytes(note_event))
-        self.note_events_session_queue.put(bytes(note_event))
-      elif self.text.strip().startswith('::'):
-        self.text = self.text.strip()[1:]
-        self.submit_note()
-      elif self.text.strip().startswith(':'):
-        command_event = events.CommandEvent(command_text=self.text.strip()[1:])
+        self.put_note_event(note_event)
+      elif text.strip().startswith('::'):
+        self.submit_note(text.strip()[1:])
+      elif text.strip().startswith(':'):
+        command_event = events.CommandEvent(command_text=text.strip()[1:])
         self.command_event_queue.put(bytes(command_event))
-        self.text = ''
+        self.buffer.clear()
       else:
-        self.submit_note()
+        self.submit_note(text)
     elif event.name == 'space':
-      self.text += ' '
+      self.buffer.insert(' ')
     elif len(event.name) == 1:
       character = event.name
       if character in character_substitutions:
         character = character_substitutions[character]
-      if is_shift_pressed():
+      if self.is_shift_pressed():
         character = shift_characters.get(character, character.upper())
-      self.text += character
+      self.buffer.insert(character)
 
-  def submit_note(self):
-    if self.text:
+  def submit_note(self, text=None):
+    """Submits text, which defaults to the contents of the buffer, as a note."""
+    if text is None:
+      text = str(self.buffer)
+    if text:
       note_event = events.NoteEvent(
-          text=self.text,
+          text=text,
           action=events.SUBMIT,
           audio_filepath=None,
           timestamp=get_timestamp())
-      self.note_events_queue.put(bytes(note_event))
-      self.note_events_session_queue.put(bytes(note_event))
+      self.put_note_event(note_event)
       # Reset the text buffer.
-      self.text = ''
+      self.buffer.clear()
 
   def handle_inactivity(self):
     self.submit_note()
@@ -177,14 +258,23 @@ class Shell:
         action=events.END_SESSION,
         audio_filepath=None,
         timestamp=get_timestamp())
-    self.note_events_queue.put(bytes(note_event))
+    journal.put_many([self.note_events_queue], [bytes(note_event)])
     self.note_events_session_queue.clear()
 
+  def flush(self):
+    """Publishes the last keypress time, and picks up changes to HOTKEY."""
+    last_press = self.last_press
+    if last_press is not None and last_press != self.last_press_flushed:
+      status.set(Status.TEXT_LAST_KEYPRESS, last_press)
+      self.last_press_flushed = last_press
+    self.load_hotkey()
+
   def wait(self):
     while True:
-      time.sleep(5)
+      time.sleep(FLUSH_SECONDS)
+      self.flush()
 
       # If 3 minutes elapse, submit the buffer as a note and clear it.
-      if self.last_press and time.time() - self.last_press > 180:
+      if self.last_press and time.time() - self.last_press > INACTIVITY_SECONDS:
         self.last_press = None
         self.handle_inactivity()
@@ -0,0 +1,63 @@
+import unittest
+
+from gonotego.text import buffer
+
+
+class TextBufferTest(unittest.TestCase):
+
+  def test_insert_and_backspace(self):
+    b = buffer.TextBuffer()
+    self.assertFalse(b)
+    b.insert('Hello')
+    b.insert(' world')
+    b.backspace()
+    self.assertEqual(str(b), 'Hello worl')
+    self.assertEqual(len(b), 10)
+    self.assertEqual(b.cursor, 10)
+
+  def test_cursor_editing(self):
+    b = buffer.TextBuffer('Hello world')
+    b.move_home()
+    b.move_right()
+    b.insert('E')
+    b.backspace()
+    b.backspace()
+    b.insert('J')
+    self.assertEqual(str(b), 'Jello world')
+    self.assertEqual(b.cursor, 1)
+    b.delete()
+    b.insert('e')
+    b.move_end()
+    b.move_left()
+    b.delete()
+    self.assertEqual(str(b), 'Jello worl')
+
+  def test_word_movement(self):
+    b = buffer.TextBuffer('one two  three')
+    b.move_word_left()
+    self.assertEqual(b.cursor, 9)
+    b.move_word_left()
+    self.assertEqual(b.cursor, 4)
+    b.move_word_right()
+    self.assertEqual(b.cursor, 7)
+    b.move_word_right()
+    self.assertEqual(b.cursor, 14)
+
+  def test_delete_word(self):
+    b = buffer.TextBuffer('one two  three  ')
+    b.delete_word()
+    self.assertEqual(str(b), 'one two  ')
+    b.move_word_left()
+    b.delete_word()
+    self.assertEqual(str(b), 'two  ')
+    b.delete_word()
+    self.assertEqual(str(b), 'two  ')
+
+  def test_paste_and_clear(self):
+    b = buffer.TextBuffer('ac')
+    b.move_left()
+    b.insert('b' * 1000)
+    self.assertEqual(str(b), 'a' + 'b' * 1000 + 'c')
+    b.clear()
+    self.assertEqual(str(b), '')
+    self.assertEqual(b.cursor, 0)
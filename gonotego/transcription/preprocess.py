@@ -0,0 +1,108 @@
+"""Prepares recordings for transcription.
+
+Transcription takes time and is billed in proportion to the length of the audio, so before
+a recording is transcribed it is downmixed to mono, resampled to 16 kHz, and stripped of
+the silence before, after, and between its speech segments. Long recordings are split at
+pauses into chunks that can be transcribed separately. The processed audio is written as
+FLAC next to the original recording, which is left untouched.
+"""
+import os
+
+import numpy as np
+import soundfile as sf
+
+from gonotego.audio import vad
+
+TARGET_SAMPLERATE = 16000
+# Recordings with more speech than this are split at pauses into several chunks.
+MAX_CHUNK_SECONDS = 120
+# Taps in the low-pass filter applied before downsampling, to avoid aliasing.
+LOWPASS_TAPS = 63
+
+
+def downmix(samples):
+  if samples.ndim > 1:
+    return samples.mean(axis=1)
+  return samples
+
+
+def resample(samples, samplerate, target_samplerate):
+  if samplerate == target_samplerate:
+    return samples
+  if target_samplerate < samplerate:
+    # Windowed-sinc low-pass filter at the target Nyquist frequency.
+    cutoff = target_samplerate / samplerate / 2
+    n = np.arange(LOWPASS_TAPS) - (LOWPASS_TAPS - 1) / 2
+    taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(LOWPASS_TAPS)
+    samples = np.convolve(samples, taps / taps.sum(), mode='same')
+  duration = len(samples) / samplerate
+  target_times = np.arange(int(duration * target_samplerate)) / target_samplerate
+  source_times = np.arange(len(samples)) / samplerate
+  return np.interp(target_times, source_times, samples).astype(np.float32)
+
+
+def pad_and_merge(segments, duration):
+  """Pads each (start, end) segment and merges any that then overlap."""
+  padded = []
+  for start, end in segments:
+    start = max(0, start - vad.PADDING_SECONDS)
+    end = min(duration, end + vad.PADDING_SECONDS)
+    if padded and start <= padded[-1][1]:
+      padded[-1] = (padded[-1][0], end)
+    else:
+      padded.append((start, end))
+  return padded
+
+
+def group_into_chunks(segments):
+  """Groups consecutive segments into chunks of at most MAX_CHUNK_SECONDS of audio.
+
+  A single segment longer than MAX_CHUNK_SECONDS gets a chunk of its own.
+  """
+  chunks = []
+  chunk_seconds = 0
+  for start, end in segments:
+    if chunks and chunk_seconds + (end - start) <= MAX_CHUNK_SECONDS:
+      chunks[-1].append((start, end))
+      chunk_seconds += end - start
+    else:
+      chunks.append([(start, end)])
+      chunk_seconds = end - start
+  return chunks
+
+
+def get_chunk_filepath(filepath, index, num_chunks):
+  base = os.path.splitext(filepath)[0]
+  if num_chunks == 1:
+    return f'{base}.processed.flac'
+  return f'{base}.processed-{index}.flac'
+
+
+def preprocess(filepath):
+  """Writes the processed audio for a recording next to it.
+
+  Args:
+    filepath: The path to the recording.
+  Returns:
+    The paths of the processed chunks, in order. If no speech is detected, returns the
+    original filepath so that nothing the detector missed is lost.
+  """
+  samples, samplerate = sf.read(filepath, dtype='float32')
+  samples = resample(downmix(samples), samplerate, TARGET_SAMPLERATE)
+  duration = len(samples) / TARGET_SAMPLERATE
+
+  segments = vad.detect_segments(samples, TARGET_SAMPLERATE)
+  if not segments:
+    return [filepath]
+  chunks = group_into_chunks(pad_and_merge(segments, duration))
+
+  chunk_filepaths = []
+  for index, chunk in enumerate(chunks):
+    chunk_samples = np.concatenate([
+        samples[int(start * TARGET_SAMPLERATE):int(end * TARGET_SAMPLERATE)]
+        for start, end in chunk
+    ])
+    chunk_filepath = get_chunk_filepath(filepath, index, len(chunks))
+    sf.write(chunk_filepath, chunk_samples, TARGET_SAMPLERATE, format='FLAC', subtype='PCM_16')
+    chunk_filepaths.append(chunk_filepath)
+  return chunk_filepaths
@@ -1,14 +1,113 @@
+import collections
+import concurrent.futures
 import os
 import time
 
+from gonotego.audio import segments
 from gonotego.common import events
 from gonotego.common import internet
 from gonotego.common import interprocess
+from gonotego.common import journal
 from gonotego.common import status
+from gonotego.settings import settings
+from gonotego.transcription import preprocess
 from gonotego.transcription import transcriber
 
 Status = status.Status
 
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_IN_FLIGHT = 4
+# How often to check for new audio events while transcriptions are in flight.
+POLL_SECONDS = 0.25
+
+
+def transcribe(t, filepath):
+  """Transcribes a recording, after trimming silence and splitting it into chunks."""
+  try:
+    chunk_filepaths = preprocess.preprocess(filepath)
+  except Exception as e:
+    print(f'Failed to preprocess {filepath}. Transcribing it as is. {repr(e)}')
+    chunk_filepaths = [filepath]
+  transcripts = [t.transcribe(chunk_filepath) for chunk_filepath in chunk_filepaths]
+  return ' '.join(transcript for transcript in transcripts if transcript)
+
+
+def process_audio_event(t, event, segment_futures=()):
+  """Transcribes the recording for an audio event. Runs on a worker thread.
+
+  Segments are transcribed as they arrive, which caches their transcripts. When the
+  recording is done, its transcript is stitched together from those of its segments.
+
+  Args:
+    t: The Transcriber.
+    event: The AudioEvent.
+    segment_futures: For a done event, the futures for its segments still in flight.
+  Returns:
+    The transcript, or None if there is nothing to transcribe.
+  """
+  if not os.path.exists(event.filepath):
+    return None
+
+  if event.action == events.AUDIO_SEGMENT:
+    try:
+      transcribe(t, event.filepath)
+    except Exception as e:
+      # The segment is transcribed again when the recording is done.
+      print(f'Failed to transcribe segment {event.filepath}. {repr(e)}')
+    return None
+
+  if event.action != events.AUDIO_DONE:
+    return None
+  # Wait for the segments so that their transcripts are read from the cache
+  # rather than transcribed a second time.
+  concurrent.futures.wait(segment_futures)
+  segment_filepaths = segments.get_segment_filepaths(event.filepath)
+  if segment_filepaths:
+    transcripts = [transcribe(t, segment_filepath) for segment_filepath in segment_filepaths]
+    transcript = ' '.join(transcript for transcript in transcripts if transcript)
+  else:
+    transcript = transcribe(t, event.filepath)
+  if transcript:
+    text_filepath = os.path.splitext(event.filepath)[0] + '.txt'
+    with open(text_filepath, 'w') as f:
+      f.write(transcript)
+    print(transcript)
+  return transcript
+
+
+def publish_transcript(event, transcript, command_events_queue, note_events_queue, note_events_session_queue):
+  """Publishes the transcript of a recording.
+
+  The audio runner enqueued a placeholder note when the recording stopped. This updates it
+  with the transcript, or removes it if there is no transcript.
+  """
+  update_event = events.NoteEvent(
+      text=transcript or '',
+      action=events.UPDATE,
+      audio_filepath=event.filepath,
+      timestamp=time.time(),
+  )
+  journal.put_many([note_events_queue], [bytes(update_event)])
+  if not transcript:
+    return
+
+  # The session queue holds the notes of the session as text, for the assistant's context.
+  note_event = events.NoteEvent(
+      text=transcript,
+      action=events.SUBMIT,
+      audio_filepath=event.filepath,
+      timestamp=update_event.timestamp,
+  )
+  note_events_session_queue.put(bytes(note_event))
+
+  # Audio commands:
+  for trigger in ['go go', 'GoGo', 'Go-Go']:
+    extended_trigger = f'{trigger} '
+    if transcript.lower().startswith(extended_trigger.lower()):
+      command_text = transcript[len(extended_trigger):] + ':'
+      command_event = events.CommandEvent(command_text)
+      command_events_queue.put(bytes(command_event))
+
 
 def main():
   print('Starting transcription.')
@@ -17,52 +116,61 @@ def main():
   note_events_queue = interprocess.get_note_events_queue()
   note_events_session_queue = interprocess.get_note_events_session_queue()
 
-  t = transcriber.Transcriber()
+  num_workers = int(settings.get_or_default('TRANSCRIPTION_WORKERS', DEFAULT_WORKERS))
+  max_in_flight = max(num_workers, int(settings.get_or_default('TRANSCRIPTION_MAX_IN_FLIGHT', DEFAULT_MAX_IN_FLIGHT)))
+  executor = concurrent.futures.ThreadPoolExecutor(max_workers=num_workers)
+  # The (audio event bytes, event, future transcript) of each audio event being
+  # transcribed, in recording order.
+  in_flight = collections.deque()
+  # The futures for the segments in flight, by the base path of their recording.
+  segment_futures = collections.defaultdict(list)
+
+  t = transcriber.make_transcriber()
   status.set(Status.TRANSCRIPTION_READY, True)
   while True:
-    audio_event_bytes = audio_events_queue.get()
-
-    if audio_event_bytes is not None:
-      print(f'Event received: {audio_event_bytes}')
+    audio_event_bytes = None
+    if len(in_flight) < max_in_flight:
+      # Block until an audio event arrives if there's nothing else to do.
+      # Otherwise just check for one, since finished transcripts need publishing.
+      audio_event_bytes = audio_events_queue.get(timeout=None if in_flight else 0)
+      if audio_event_bytes is not None:
+        print(f'Event received: {audio_event_bytes}')
 
-      # Don't start transcribing until we have an internet connection.
-      internet.wait_for_internet()
+        # Don't start transcribing until we have an internet connection,
+        # unless the transcriber runs locally.
+        if t.requires_internet:
+          internet.wait_for_internet()
 
-      event = events.AudioEvent.from_bytes(audio_event_bytes)
-      if event.action == events.AUDIO_DONE and os.path.exists(event.filepath):
+        event = events.AudioEvent.from_bytes(audio_event_bytes)
+        base = segments.get_base(event.filepath)
+        if event.action == events.AUDIO_SEGMENT:
+          future = executor.submit(process_audio_event, t, event)
+          segment_futures[base].append(future)
+        else:
+          future = executor.submit(process_audio_event, t, event, segment_futures.pop(base, ()))
+        in_flight.append((audio_event_bytes, event, future))
         status.set(Status.TRANSCRIPTION_ACTIVE, True)
-        transcript = t.transcribe(event.filepath)
-        if transcript:
-          text_filepath = event.filepath.replace('.wav', '.txt')
-          with open(text_filepath, 'w') as f:
-            f.write(transcript)
-          print(transcript)
-          # TODO(dbieber): Add the note event for audio when the audio is captured,
-          # rather than waiting until its transcribed. Use a placeholder with an id.
-          # Update that placeholder once the transcription is ready.
-          note_event = events.NoteEvent(
-              text=transcript,
-              action=events.SUBMIT,
-              audio_filepath=event.filepath,
-              timestamp=time.time(),
-          )
-          note_events_queue.put(bytes(note_event))
-          note_events_session_queue.put(bytes(note_event))
-
-          # Audio commands:
-          for trigger in ['go go', 'GoGo', 'Go-Go']:
-            extended_trigger = f'{trigger} '
-            if transcript.lower().startswith(extended_trigger.lower()):
-              command_text = transcript[len(extended_trigger):] + ':'
-              command_event = events.CommandEvent(command_text)
-              command_events_queue.put(bytes(command_event))
 
-        status.set(Status.TRANSCRIPTION_ACTIVE, False)
-    else:
-      # No audio ready to transcribe. Sleep.
-      time.sleep(1)
+    if in_flight and audio_event_bytes is None:
+      # Wait for the oldest transcription, checking back periodically for new audio events.
+      concurrent.futures.wait([in_flight[0][2]], timeout=POLL_SECONDS)
 
-    audio_events_queue.commit(audio_event_bytes)
+    # Publish finished transcripts in recording order. Each audio event is committed
+    # only once its note update has been enqueued.
+    while in_flight and in_flight[0][2].done():
+      audio_event_bytes, event, future = in_flight.popleft()
+      base = segments.get_base(event.filepath)
+      if future in segment_futures.get(base, ()):
+        # Finished segments need no waiting on. This also forgets the segments of canceled recordings.
+        segment_futures[base].remove(future)
+        if not segment_futures[base]:
+          del segment_futures[base]
+      transcript = future.result()
+      if event.action == events.AUDIO_DONE:
+        publish_transcript(event, transcript, command_events_queue, note_events_queue, note_events_session_queue)
+      audio_events_queue.commit(audio_event_bytes)
+      if not in_flight:
+        status.set(Status.TRANSCRIPTION_ACTIVE, False)
 
 
 if __name__ == '__main__':
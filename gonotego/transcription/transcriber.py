@@ -1,15 +1,102 @@
+"""Transcribers turn recordings into text.
+
+The TRANSCRIPTION_BACKEND setting selects the backend:
+  openai: OpenAI's whisper-1 API. Needs an internet connection.
+  vosk: A local Vosk model. Runs on the CPU, so it works offline.
+  whispercpp: A local whisper.cpp model run through its command line tool. Also offline.
+
+Transcripts are cached in redis by the contents of the audio and the backend that
+transcribed it, so audio that is transcribed again (e.g. after a crash, or when a recording
+is requeued) costs neither a network round trip nor another API call. Each transcript is
+its own key, which expires after CACHE_TTL_SECONDS, by which time the recording has long
+since been published.
+"""
+import abc
+import hashlib
 import io
+import json
+import os
+import subprocess
+import tempfile
+import threading
 
 import fire
-import openai
+import numpy as np
+import soundfile as sf
+
+from gonotego.common import interprocess
+from gonotego.common import openai_client
 from gonotego.settings import settings
+from gonotego.transcription import preprocess
+
+try:
+  import vosk
+except:
+  vosk = None
+
+DEFAULT_BACKEND = 'openai'
+DEFAULT_VOSK_MODEL_PATH = '/home/pi/models/vosk-model-small-en-us-0.15'
+DEFAULT_WHISPER_CPP_BINARY = '/home/pi/code/github/ggerganov/whisper.cpp/build/bin/whisper-cli'
+DEFAULT_WHISPER_CPP_MODEL_PATH = '/home/pi/models/ggml-tiny.en-q5_1.bin'
+# The local engines expect 16 kHz mono audio.
+LOCAL_SAMPLERATE = 16000
+VOSK_CHUNK_FRAMES = 4000
+
+# Each transcript is cached under '<prefix><backend name>:<sha256 of the audio>'.
+CACHE_KEY_PREFIX = 'GoNoteGo:transcription_cache:'
+CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+HASH_BLOCK_SIZE = 1 << 16
+
+
+def read_mono_16k(filepath):
+  """Reads a recording as 16-bit 16 kHz mono samples."""
+  samples, samplerate = sf.read(filepath, dtype='float32')
+  samples = preprocess.resample(preprocess.downmix(samples), samplerate, LOCAL_SAMPLERATE)
+  return (np.clip(samples, -1, 1) * 32767).astype(np.int16)
 
 
-class Transcriber:
+def get_cache_key(name, filepath):
+  digest = hashlib.sha256()
+  with open(filepath, 'rb') as f:
+    for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+      digest.update(block)
+  return f'{CACHE_KEY_PREFIX}{name}:{digest.hexdigest()}'
+
+
+class Transcriber(abc.ABC):
+  """A transcription backend.
+
+  Subclasses set name, which identifies the backend and model in the cache, and implement
+  transcribe_uncached.
+  """
+
+  name = None
+  requires_internet = False
 
   def transcribe(self, filepath):
-    client = openai.OpenAI(api_key=settings.get('OPENAI_API_KEY'))
-    with io.open(filepath, 'rb') as audio_file:
+    r = interprocess.get_redis_client()
+    key = get_cache_key(self.name, filepath)
+    cached = r.get(key)
+    if cached is not None:
+      return cached.decode('utf-8')
+    transcript = self.transcribe_uncached(filepath)
+    r.set(key, transcript.encode('utf-8'), ex=CACHE_TTL_SECONDS)
+    return transcript
+
+  @abc.abstractmethod
+  def transcribe_uncached(self, filepath):
+    """Transcribes the recording at filepath, bypassing the cache."""
+
+
+class OpenAITranscriber(Transcriber):
+  """Transcribes with OpenAI's whisper-1 API."""
+
+  name = 'openai:whisper-1'
+  requires_internet = True
+
+  def transcribe_uncached(self, filepath):
+    client = openai_client.get_client()
+    with io.open(filepath, 'rb') as audio_file, openai_client.timed('transcription'):
       response = client.audio.transcriptions.create(
           model="whisper-1",
           file=audio_file
@@ -18,5 +105,77 @@ class Transcriber:
       return transcription.strip()
 
 
+class VoskTranscriber(Transcriber):
+  """Transcribes on the CPU with a Vosk model."""
+
+  requires_internet = False
+
+  def __init__(self, model_path):
+    if vosk is None:
+      raise ValueError('The vosk backend requires the vosk package. Install it with: pip install vosk')
+    self.model_path = model_path
+    self.name = f'vosk:{os.path.basename(model_path)}'
+    self._model = None
+    # Transcription workers share the transcriber, so only one of them loads the model.
+    self._model_lock = threading.Lock()
+
+  @property
+  def model(self):
+    # Loading the model takes a while, so it is only done once it is needed.
+    if self._model is None:
+      with self._model_lock:
+        if self._model is None:
+          self._model = vosk.Model(self.model_path)
+    return self._model
+
+  def transcribe_uncached(self, filepath):
+    samples = read_mono_16k(filepath)
+    recognizer = vosk.KaldiRecognizer(self.model, LOCAL_SAMPLERATE)
+    texts = []
+    for start in range(0, len(samples), VOSK_CHUNK_FRAMES):
+      if recognizer.AcceptWaveform(samples[start:start + VOSK_CHUNK_FRAMES].tobytes()):
+        texts.append(json.loads(recognizer.Result())['text'])
+    texts.append(json.loads(recognizer.FinalResult())['text'])
+    return ' '.join(text for text in texts if text).strip()
+
+
+class WhisperCppTranscriber(Transcriber):
+  """Transcribes on the CPU with a whisper.cpp model, using the whisper.cpp command line tool."""
+
+  requires_internet = False
+
+  def __init__(self, binary, model_path):
+    self.binary = binary
+    self.model_path = model_path
+    self.name = f'whispercpp:{os.path.basename(model_path)}'
+
+  def transcribe_uncached(self, filepath):
+    # whisper.cpp only reads 16 kHz WAV files.
+    with tempfile.NamedTemporaryFile(suffix='.wav') as wav_file:
+      sf.write(wav_file.name, read_mono_16k(filepath), LOCAL_SAMPLERATE, format='WAV', subtype='PCM_16')
+      output = subprocess.check_output(
+          [self.binary, '-m', self.model_path, '-f', wav_file.name, '--no-timestamps'],
+          stderr=subprocess.DEVNULL)
+    return ' '.join(output.decode('utf-8').split())
+
+
+def make_transcriber(backend=None):
+  backend = (backend or settings.get_or_default('TRANSCRIPTION_BACKEND', DEFAULT_BACKEND)).lower()
+  if backend == 'openai':
+    return OpenAITranscriber()
+  elif backend == 'vosk':
+    return VoskTranscriber(settings.get_or_default('VOSK_MODEL_PATH', DEFAULT_VOSK_MODEL_PATH))
+  elif backend == 'whispercpp':
+    return WhisperCppTranscriber(
+        settings.get_or_default('WHISPER_CPP_BINARY', DEFAULT_WHISPER_CPP_BINARY),
+        settings.get_or_default('WHISPER_CPP_MODEL_PATH', DEFAULT_WHISPER_CPP_MODEL_PATH))
+  else:
+    raise ValueError('Unexpected TRANSCRIPTION_BACKEND in settings', backend)
+
+
+def transcribe(filepath, backend=None):
+  return make_transcriber(backend).transcribe(filepath)
+
+
 if __name__ == '__main__':
   fire.Fire()
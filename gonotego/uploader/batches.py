@@ -0,0 +1,77 @@
+"""Uploading a batch of note events from the note events queue.
+
+A batch is committed from the queue, and from the journal, as far as it was uploaded, so
+a failed upload is retried from the first note event that was not uploaded.
+"""
+from gonotego.common import events
+from gonotego.common import journal
+
+
+def without_updates(note_event):
+  """Adapts a note event for uploaders that cannot edit the notes they have uploaded.
+
+  Placeholder notes are dropped, and each update is uploaded as a new note instead.
+
+  Returns:
+    The note event to upload, or None if there is nothing to upload.
+  """
+  if note_event.action == events.AUDIO_PLACEHOLDER:
+    return None
+  if note_event.action == events.UPDATE:
+    if not note_event.text:
+      return None
+    return events.NoteEvent(
+        text=note_event.text,
+        action=events.SUBMIT,
+        audio_filepath=note_event.audio_filepath,
+        timestamp=note_event.timestamp,
+    )
+  return note_event
+
+
+def get_uploads(note_events, supports_updates):
+  """Returns the (position in the batch, note event) of each note event to upload."""
+  uploads = []
+  for position, note_event in enumerate(note_events):
+    if not supports_updates:
+      note_event = without_updates(note_event)
+    if note_event is not None:
+      uploads.append((position, note_event))
+  return uploads
+
+
+def commit(note_events_queue, note_event_bytes_list):
+  """Marks note events as uploaded, first in the queue and then in the journal.
+
+  If the uploader stops between the two, recovery puts the note events back on the queue
+  and they are uploaded again, rather than lost.
+  """
+  note_events_queue.commit_batch(note_event_bytes_list)
+  journal.get_journal().advance_watermark(note_event_bytes_list)
+
+
+def upload(uploader, note_events_queue, note_event_bytes_list, uploads):
+  """Uploads a batch of note events, committing the ones uploaded even if the rest fail.
+
+  Uploaders yield each note event once it is uploaded, in order, and stop at the first one
+  that fails. The queue items before the first note event not uploaded are committed, so
+  a retry resumes from there rather than uploading the earlier notes again. If the upload
+  raises, the items uploaded so far are still committed.
+
+  Returns:
+    Whether every note event was uploaded.
+  """
+  uploaded = 0
+  try:
+    for unused_note_event in uploader.upload([note_event for unused_position, note_event in uploads]):
+      uploaded += 1
+  finally:
+    if uploaded < len(uploads):
+      completed, unused_note_event = uploads[uploaded]
+    else:
+      completed = len(note_event_bytes_list)
+    commit(note_events_queue, note_event_bytes_list[:completed])
+    if completed < len(note_event_bytes_list):
+      # Get the rest of the batch again on the next attempt.
+      note_events_queue.reset()
+  return uploaded == len(uploads)
@@ -14,9 +14,13 @@ def clip(x, a, b):
 
 class Uploader:
 
+  supports_updates = True
+
   def __init__(self):
     self.last_indent_level = -1
     self.indent_level = 0
+    # The draft line of each placeholder note awaiting its transcript, by audio filepath.
+    self.placeholder_lines = {}
 
   def upload(self, note_events):
     for note_event in note_events:
@@ -31,13 +35,39 @@ class Uploader:
         self.indent_level = clip(self.indent_level - 1, 0, self.last_indent_level + 1)
       elif note_event.action == events.END_SESSION:
         self.end_session()
-      elif note_event.action == events.SUBMIT:
-        text = note_event.text.strip()
-        line = '  ' * self.indent_level + text
-        with open(DRAFT_FILENAME, 'a') as f:
-          f.write(line + '\n')
-        self.last_indent_level = self.indent_level
-    return True
+      elif note_event.action in (events.SUBMIT, events.AUDIO_PLACEHOLDER):
+        line = self.write_line(note_event.text)
+        if note_event.action == events.AUDIO_PLACEHOLDER:
+          self.placeholder_lines[note_event.audio_filepath] = line
+      elif note_event.action == events.UPDATE:
+        line = self.placeholder_lines.pop(note_event.audio_filepath, None)
+        if line is not None:
+          self.replace_line(line, note_event.text)
+        elif note_event.text:
+          # The placeholder was sent in an earlier email, so add the note as new.
+          self.write_line(note_event.text)
+      yield note_event
+
+  def write_line(self, text):
+    """Appends a note to the draft at the current indent level. Returns the line written."""
+    line = '  ' * self.indent_level + text.strip()
+    with open(DRAFT_FILENAME, 'a') as f:
+      f.write(line + '\n')
+    self.last_indent_level = self.indent_level
+    return line
+
+  def replace_line(self, line, text):
+    """Replaces the text of a line in the draft, keeping its indentation, or removes it if text is empty."""
+    with open(DRAFT_FILENAME, 'r') as f:
+      lines = f.read().split('\n')
+    index = lines.index(line)
+    if text.strip():
+      indentation = line[:len(line) - len(line.lstrip(' '))]
+      lines[index] = indentation + text.strip()
+    else:
+      del lines[index]
+    with open(DRAFT_FILENAME, 'w') as f:
+      f.write('\n'.join(lines))
 
   def handle_inactivity(self):
     self.end_session()
@@ -58,3 +88,4 @@ class Uploader:
     open(DRAFT_FILENAME, 'w').close()
     self.last_indent_level = -1
     self.indent_level = 0
+    self.placeholder_lines = {}
@@ -34,7 +34,7 @@ class Uploader:
         else:
           is_read = True
         upload_mem(text, is_read=is_read)
-    return True
+      yield note_event
 
   def handle_inactivity(self):
     pass
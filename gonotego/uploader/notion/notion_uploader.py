@@ -83,8 +83,9 @@ class Uploader:
         if note_event.audio_filepath and os.path.exists(note_event.audio_filepath):
           url = blob_uploader.upload_blob(note_event.audio_filepath, client)
           blocks.append(make_audio_block(url))
+    # The notes are appended in a single request, so they are uploaded all at once.
     append_notes(blocks, page_id=self.current_page_id)
-    return True
+    yield from note_events
 
   def handle_inactivity(self):
     self.current_page_id = None
@@ -170,6 +170,59 @@ let getRoamDate = dateString => {
 }
 
 
+function getBlockString(block_uid) {
+  // returns the text of a block, or undefined if there is no such block.
+  // _block_uid_: the uid of the block.
+  let results = window.roamAlphaAPI.q(`
+    [:find ?block_string
+     :in $ ?block_uid
+     :where
+     [?block :block/uid ?block_uid]
+     [?block :block/string ?block_string]
+    ]`, block_uid);
+  if (results.length) {
+    return results[0][0];
+  }
+}
+
+async function pollUntil(condition, attempts) {
+  // returns whether condition() became true, checking every 25ms up to _attempts_ times.
+  // _condition_: a function returning whether to stop polling.
+  // _attempts_: the maximum number of checks.
+  for (let attempt = 0; attempt < attempts; attempt++) {
+    if (condition()) return true;
+    await sleep(25);
+  }
+  return false;
+}
+
+async function updateBlock(block_uid, block) {
+  // replaces the text of a block, returning the block's uid, or null if the update failed.
+  // _block_uid_: the uid of the block.
+  // _block_: the new text of the block.
+  try {
+    await window.roamAlphaAPI.updateBlock({"block": {"uid": block_uid, "string": block}});
+  } catch (e) {
+    console.error(e);
+    return null;
+  }
+  let updated = await pollUntil(() => getBlockString(block_uid) === block, 200);
+  return updated ? block_uid : null;
+}
+
+async function deleteBlock(block_uid) {
+  // deletes a block and its children, returning the block's uid, or null if the deletion failed.
+  // _block_uid_: the uid of the block.
+  try {
+    await window.roamAlphaAPI.deleteBlock({"block": {"uid": block_uid}});
+  } catch (e) {
+    console.error(e);
+    return null;
+  }
+  let deleted = await pollUntil(() => getBlockString(block_uid) === undefined, 200);
+  return deleted ? block_uid : null;
+}
+
 async function insertGoNoteGoNote(note) {
   // inserts the note into the Go Note Go Notes section of your Daily Notes page.
   // _note_: a string to insert as a new note.
@@ -199,6 +252,9 @@ window.getOrCreateBlockOnPage = getOrCreateBlockOnPage;
 window.getChildBlock = getChildBlock;
 window.getOrCreateChildBlock = getOrCreateChildBlock;
 window.createChildBlock = createChildBlock;
+window.getBlockString = getBlockString;
+window.updateBlock = updateBlock;
+window.deleteBlock = deleteBlock;
 
 window.nthDate = nthDate;
 window.getRoamDate = getRoamDate;
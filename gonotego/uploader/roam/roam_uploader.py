@@ -149,6 +149,22 @@ class RoamBrowser:
     time.sleep(0.25)
     return self.get_insertion_result()
 
+  def update_block(self, block_uid, block):
+    block_uid_json = json_encode(block_uid)
+    block_json = json_encode(block)
+    # Cleared first, so that a script that fails to run is not mistaken for a success.
+    js = f'window.insertion_result = null; window.insertion_result = updateBlock({block_uid_json}, {block_json});'
+    self.utils.execute_script_tag(js)
+    time.sleep(0.25)
+    return self.get_insertion_result()
+
+  def delete_block(self, block_uid):
+    block_uid_json = json_encode(block_uid)
+    js = f'window.insertion_result = null; window.insertion_result = deleteBlock({block_uid_json});'
+    self.utils.execute_script_tag(js)
+    time.sleep(0.25)
+    return self.get_insertion_result()
+
   def sleep_until_astrolabe_gone(self, timeout=90):
     while self.driver.find_elements_by_class_name('loading-astrolabe'):
       print('Astrolabe still there.')
@@ -161,6 +177,8 @@ class RoamBrowser:
 
 class Uploader:
 
+  supports_updates = True
+
   def __init__(self, headless=True):
     self.headless = headless
     self._browser = None
@@ -168,6 +186,8 @@ class Uploader:
     self.session_uid = None
     self.last_note_uid = None
     self.stack = []
+    # The block uid of each placeholder note awaiting its transcript, by audio filepath.
+    self.placeholder_uids = {}
 
     # In case Roam crashed leaving the browser open, we close it on start.
     self.close_browser()
@@ -205,8 +225,8 @@ class Uploader:
       print("Failed to access Roam graph. Aborting upload.")
       browser.screenshot('screenshot-go_graph-failure.png')
       flush()
-      return False
-      
+      return
+
     time.sleep(0.5)
     browser.screenshot('screenshot-graph-later.png')
     browser.execute_helper_js()
@@ -230,35 +250,77 @@ class Uploader:
           self.stack.pop()
       elif note_event.action == events.END_SESSION:
         self.end_session()
-      elif note_event.action == events.SUBMIT:
-        if self.session_uid is None:
-          self.new_session()
-        text = note_event.text.strip()
-        has_audio = note_event.audio_filepath and os.path.exists(note_event.audio_filepath)
-        if has_audio:
-          text = f'{text} #[[unverified transcription]]'
-        if self.stack:
-          parent_uid = self.stack[-1]
-        else:
-          parent_uid = self.session_uid
-        block_uid = browser.create_child_block(parent_uid, text)
+      elif note_event.action in (events.SUBMIT, events.AUDIO_PLACEHOLDER):
+        block_uid = self.insert_note(browser, client, note_event)
         if not block_uid:
-          print('create_child_block did not yield a block_uid. Aborting upload.')
-          browser.screenshot('screenshot-create_child_block-failure.png')
-          flush()
-          return False
-        self.last_note_uid = block_uid
-        print(f'Inserted: "{text}" at block (({block_uid}))')
-        if has_audio:
-          embed_url = blob_uploader.upload_blob(note_event.audio_filepath, client)
-          embed_text = '{{audio: ' + embed_url + '}}'
-          print(f'Audio embed: {embed_text}')
-          if block_uid:
-            browser.create_child_block(block_uid, embed_text)
+          return
+        if note_event.action == events.AUDIO_PLACEHOLDER:
+          self.placeholder_uids[note_event.audio_filepath] = block_uid
+      elif note_event.action == events.UPDATE:
+        block_uid = self.placeholder_uids.pop(note_event.audio_filepath, None)
+        if block_uid is None:
+          # The placeholder was never uploaded here, so insert the note as new.
+          if note_event.text and not self.insert_note(browser, client, note_event):
+            return
+        elif note_event.text:
+          text = self.get_text(note_event)
+          if not browser.update_block(block_uid, text):
+            print('update_block did not update the placeholder. Aborting upload.')
+            browser.screenshot('screenshot-update_block-failure.png')
+            flush()
+            # Keep the placeholder, so that the retry updates it.
+            self.placeholder_uids[note_event.audio_filepath] = block_uid
+            return
+          print(f'Updated: "{text}" at block (({block_uid}))')
+          self.add_audio_embed(browser, client, note_event, block_uid)
+        else:
+          if not browser.delete_block(block_uid):
+            print('delete_block did not delete the placeholder. Aborting upload.')
+            browser.screenshot('screenshot-delete_block-failure.png')
+            flush()
+            self.placeholder_uids[note_event.audio_filepath] = block_uid
+            return
+          print(f'Deleted placeholder block (({block_uid}))')
 
       flush()
-    
-    return True
+      yield note_event
+
+  def get_text(self, note_event):
+    text = note_event.text.strip()
+    if note_event.action != events.AUDIO_PLACEHOLDER and self.has_audio(note_event):
+      text = f'{text} #[[unverified transcription]]'
+    return text
+
+  def has_audio(self, note_event):
+    return note_event.audio_filepath and os.path.exists(note_event.audio_filepath)
+
+  def insert_note(self, browser, client, note_event):
+    """Inserts a note at the current position. Returns its block uid, or None on failure."""
+    if self.session_uid is None:
+      self.new_session()
+    text = self.get_text(note_event)
+    if self.stack:
+      parent_uid = self.stack[-1]
+    else:
+      parent_uid = self.session_uid
+    block_uid = browser.create_child_block(parent_uid, text)
+    if not block_uid:
+      print('create_child_block did not yield a block_uid. Aborting upload.')
+      browser.screenshot('screenshot-create_child_block-failure.png')
+      flush()
+      return None
+    self.last_note_uid = block_uid
+    print(f'Inserted: "{text}" at block (({block_uid}))')
+    if note_event.action != events.AUDIO_PLACEHOLDER:
+      self.add_audio_embed(browser, client, note_event, block_uid)
+    return block_uid
+
+  def add_audio_embed(self, browser, client, note_event, block_uid):
+    if self.has_audio(note_event):
+      embed_url = blob_uploader.upload_blob(note_event.audio_filepath, client)
+      embed_text = '{{audio: ' + embed_url + '}}'
+      print(f'Audio embed: {embed_text}')
+      browser.create_child_block(block_uid, embed_text)
 
   def handle_inactivity(self):
     self.end_session()
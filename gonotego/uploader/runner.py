@@ -4,8 +4,10 @@ import time
 from gonotego.common import events
 from gonotego.common import internet
 from gonotego.common import interprocess
+from gonotego.common import journal
 from gonotego.common import status
 from gonotego.settings import settings
+from gonotego.uploader import batches
 from gonotego.uploader.email import email_uploader
 from gonotego.uploader.ideaflow import ideaflow_uploader
 from gonotego.uploader.remnote import remnote_uploader
@@ -17,6 +19,10 @@ from gonotego.uploader.twitter import twitter_uploader
 
 Status = status.Status
 
+QUEUE_WAIT_SECONDS = 60
+# The maximum number of note events to pass to the uploader at once.
+UPLOAD_BATCH_SIZE = 100
+
 
 def print_configuration_help():
   """Print helpful message when NOTE_TAKING_SYSTEM is not configured."""
@@ -65,6 +71,11 @@ def main():
   except ValueError as e:
     print(e, file=sys.stderr)
     return
+
+  # Put back any note events that redis lost, from the journal.
+  recovered = journal.get_journal().recover(note_events_queue)
+  if recovered:
+    print(f'Recovered {recovered} note events from the journal.')
   status.set(Status.UPLOADER_READY, True)
 
   last_upload = None
@@ -84,37 +95,38 @@ def main():
 
       uploader = make_uploader(note_taking_system)
 
-    note_event_bytes_list = []
-    note_events = []
-    while note_events_queue.size() > 0:
-      print('Note event received')
-      note_event_bytes = note_events_queue.get()
-      note_event_bytes_list.append(note_event_bytes)
-      note_event = events.NoteEvent.from_bytes(note_event_bytes)
-      note_events.append(note_event)
+    # Block until note events arrive, waking periodically to check for inactivity.
+    note_event_bytes_list = note_events_queue.get_batch(UPLOAD_BATCH_SIZE, timeout=QUEUE_WAIT_SECONDS)
+    if note_event_bytes_list:
+      print(f'{len(note_event_bytes_list)} note events received')
+    note_events = [
+        events.NoteEvent.from_bytes(note_event_bytes)
+        for note_event_bytes in note_event_bytes_list
+    ]
+
+    uploads = batches.get_uploads(note_events, getattr(uploader, 'supports_updates', False))
 
-    if note_events:
+    if uploads:
       status.set(Status.UPLOADER_ACTIVE, True)
-      # TODO(dbieber): Allow uploader to yield note events as it finishes them.
-      # So that if it fails midway, we can still mark the completed events as done.
-      upload_successful = uploader.upload(note_events)
+      try:
+        upload_successful = batches.upload(uploader, note_events_queue, note_event_bytes_list, uploads)
+      finally:
+        status.set(Status.UPLOADER_ACTIVE, False)
       if upload_successful:
         last_upload = time.time()
         print('Uploaded.')
       else:
         print('Upload unsuccessful.')
-
-      status.set(Status.UPLOADER_ACTIVE, False)
-      if upload_successful:
-        for note_event_bytes in note_event_bytes_list:
-          note_events_queue.commit(note_event_bytes)
+        # Avoid retrying in a tight loop.
+        time.sleep(1)
+    elif note_event_bytes_list:
+      # without_updates dropped every note event, so there is nothing to upload.
+      batches.commit(note_events_queue, note_event_bytes_list)
 
     if last_upload and time.time() - last_upload > 600:
       # X minutes have passed since the last upload.
       uploader.handle_inactivity()
 
-    time.sleep(1)
-
 
 if __name__ == '__main__':
   main()
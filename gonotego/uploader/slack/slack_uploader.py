@@ -1,7 +1,7 @@
 """Uploader for Slack workspace channels."""
 
 import logging
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
@@ -15,12 +15,17 @@ logger = logging.getLogger(__name__)
 class Uploader:
   """Uploader implementation for Slack."""
 
+  supports_updates = True
+
   def __init__(self):
     self._client: Optional[WebClient] = None
     self._channel_id: Optional[str] = None
     self._thread_ts: Optional[str] = None
     self._session_started: bool = False
     self._indent_level: int = 0
+    # The ts of each placeholder message awaiting its transcript, along with the indent
+    # level it was posted at and whether it started its thread, by audio filepath.
+    self._placeholders: Dict[str, Tuple[str, int, bool]] = {}
 
   @property
   def client(self) -> WebClient:
@@ -67,96 +72,139 @@ class Uploader:
     logger.error(f"Channel {channel_name} not found in workspace")
     raise ValueError(f"Channel {channel_name} not found in workspace")
 
-  def _start_session(self, first_note: str) -> bool:
-    """Start a new session thread in the configured Slack channel."""
+  def _format_note(self, text: str, indent_level: int, is_thread_start: bool) -> str:
+    """Format the text of a note as it is posted."""
+    if is_thread_start:
+      return f"{text}\n\n:keyboard: Go Note Go thread."
+    if indent_level > 0:
+      # Add bullet and proper indentation
+      bullet = "•"
+      indentation = "  " * (indent_level - 1)
+      return f"{indentation}{bullet} {text}"
+    return text
+
+  def _start_session(self, first_note: str) -> Optional[str]:
+    """Start a new session thread in the configured Slack channel.
+
+    Returns:
+      The ts of the message starting the thread, or None on failure.
+    """
     channel_id = self._get_channel_id()
 
     # Create the initial message with the note content
     try:
-      message_text = f"{first_note}\n\n:keyboard: Go Note Go thread."
+      message_text = self._format_note(first_note, 0, is_thread_start=True)
       response = self.client.chat_postMessage(
           channel=channel_id,
           text=message_text
       )
       self._thread_ts = response['ts']
       self._session_started = True
-      return True
+      return self._thread_ts
     except SlackApiError as e:
       logger.error(f"Error starting session: {e}")
-      return False
+      return None
 
-  def _send_note_to_thread(self, text: str, indent_level: int = 0) -> bool:
-    """Send a note as a reply in the current thread."""
+  def _send_note_to_thread(self, text: str, indent_level: int = 0) -> Optional[str]:
+    """Send a note as a reply in the current thread.
+
+    Returns:
+      The ts of the reply, or None on failure.
+    """
     if not self._thread_ts:
       logger.error("Trying to send to thread but no thread exists")
-      return False
+      return None
 
     channel_id = self._get_channel_id()
 
     # Format the text based on indentation
-    formatted_text = text
-    if indent_level > 0:
-      # Add bullet and proper indentation
-      bullet = "•"
-      indentation = "  " * (indent_level - 1)
-      formatted_text = f"{indentation}{bullet} {text}"
+    formatted_text = self._format_note(text, indent_level, is_thread_start=False)
 
     try:
-      self.client.chat_postMessage(
+      response = self.client.chat_postMessage(
           channel=channel_id,
           text=formatted_text,
           thread_ts=self._thread_ts
       )
-      return True
+      return response['ts']
     except SlackApiError as e:
       logger.error(f"Error sending note to thread: {e}")
+      return None
+
+  def _post_note(self, text: str) -> Optional[str]:
+    """Post a note, starting a new session thread if needed. Returns the message ts."""
+    # Start a new session for the first note
+    if not self._session_started:
+      return self._start_session(text)
+    # Send as a reply to the thread with proper indentation
+    return self._send_note_to_thread(text, self._indent_level)
+
+  def _update_placeholder(self, ts: str, indent_level: int, is_thread_start: bool, text: str) -> bool:
+    """Replace the text of a placeholder message, or delete it if text is empty."""
+    channel_id = self._get_channel_id()
+    try:
+      if text:
+        formatted_text = self._format_note(text, indent_level, is_thread_start)
+        self.client.chat_update(channel=channel_id, ts=ts, text=formatted_text)
+      else:
+        self.client.chat_delete(channel=channel_id, ts=ts)
+      return True
+    except SlackApiError as e:
+      logger.error(f"Error updating placeholder: {e}")
       return False
 
-  def upload(self, note_events: List[events.NoteEvent]) -> bool:
+  def upload(self, note_events: List[events.NoteEvent]) -> Iterator[events.NoteEvent]:
     """Upload note events to Slack.
 
     Args:
       note_events: List of NoteEvent objects.
 
-    Returns:
-      bool: True if upload successful, False otherwise.
+    Yields:
+      Each note event once it is uploaded. Stops at the first note event that fails.
     """
     for note_event in note_events:
       # Handle indent/unindent events to track indentation level
       if note_event.action == events.INDENT:
         self._indent_level += 1
-        continue
       elif note_event.action == events.UNINDENT:
         self._indent_level = max(0, self._indent_level - 1)
-        continue
       elif note_event.action == events.CLEAR_EMPTY:
         self._indent_level = 0
-        continue
       elif note_event.action == events.ENTER_EMPTY:
         # When you submit from an empty note, that pops from the stack.
         self._indent_level = max(0, self._indent_level - 1)
-      elif note_event.action == events.SUBMIT:
+      elif note_event.action in (events.SUBMIT, events.AUDIO_PLACEHOLDER):
         text = note_event.text.strip()
 
         # Skip empty notes
-        if not text:
-          continue
-
-        # Start a new session for the first note
-        if not self._session_started:
-          success = self._start_session(text)
+        if text:
+          is_thread_start = not self._session_started
+          ts = self._post_note(text)
+          if not ts:
+            logger.error("Failed to upload note to Slack")
+            return
+          if note_event.action == events.AUDIO_PLACEHOLDER:
+            self._placeholders[note_event.audio_filepath] = (ts, self._indent_level, is_thread_start)
+
+      elif note_event.action == events.UPDATE:
+        text = note_event.text.strip()
+        placeholder = self._placeholders.pop(note_event.audio_filepath, None)
+        if placeholder is not None:
+          success = self._update_placeholder(*placeholder, text)
+        elif text:
+          # The placeholder was never posted here, so post the note as new.
+          success = bool(self._post_note(text))
         else:
-          # Send as a reply to the thread with proper indentation
-          success = self._send_note_to_thread(text, self._indent_level)
+          success = True
 
         if not success:
-          logger.error("Failed to upload note to Slack")
-          return False
+          logger.error("Failed to update note in Slack")
+          return
 
       elif note_event.action == events.END_SESSION:
         self.end_session()
 
-    return True
+      yield note_event
 
   def end_session(self) -> None:
     """End the current session."""
@@ -0,0 +1,121 @@
+import tempfile
+import unittest
+
+from gonotego.common import events
+from gonotego.common import journal
+from gonotego.uploader import batches
+
+
+class FakeQueue:
+  """A list queue, as InterprocessQueue without redis."""
+
+  def __init__(self, values):
+    self.values = list(values)
+    self.index = 0
+
+  def get_batch(self, max_items):
+    values = self.values[self.index:self.index + max_items]
+    self.index += len(values)
+    return values
+
+  def commit_batch(self, values):
+    assert self.values[:len(values)] == values
+    del self.values[:len(values)]
+    self.index -= len(values)
+
+  def reset(self):
+    self.index = 0
+
+
+class FakeUploader:
+  """Uploads until it reaches fail_at, where it stops, or raises if raise_error is set."""
+
+  def __init__(self, fail_at=None, raise_error=False, supports_updates=False):
+    self.fail_at = fail_at
+    self.raise_error = raise_error
+    self.supports_updates = supports_updates
+    self.uploaded = []
+
+  def upload(self, note_events):
+    for note_event in note_events:
+      if note_event.text == self.fail_at:
+        if self.raise_error:
+          raise RuntimeError('Upload failed.')
+        return
+      self.uploaded.append(note_event.text)
+      yield note_event
+
+
+def make_note_event(text, action=events.SUBMIT, audio_filepath=None):
+  return events.NoteEvent(text=text, action=action, audio_filepath=audio_filepath, timestamp=1.0)
+
+
+class UploadTest(unittest.TestCase):
+
+  def setUp(self):
+    self.directory = tempfile.TemporaryDirectory()
+    self.original_journal = journal._journal
+    journal._journal = journal.Journal(self.directory.name, group_commit_seconds=0)
+
+    self.values = [bytes(note_event) for note_event in [
+        make_note_event('a'),
+        make_note_event('[Transcribing]', action=events.AUDIO_PLACEHOLDER, audio_filepath='out/1.wav'),
+        make_note_event('b'),
+        make_note_event('', action=events.UPDATE, audio_filepath='out/1.wav'),
+        make_note_event('c'),
+    ]]
+    with journal.get_journal().locked():
+      journal.get_journal().append(self.values)
+    self.queue = FakeQueue(self.values)
+
+  def tearDown(self):
+    journal._journal = self.original_journal
+    self.directory.cleanup()
+
+  def upload(self, uploader):
+    note_event_bytes_list = self.queue.get_batch(100)
+    note_events = [events.NoteEvent.from_bytes(value) for value in note_event_bytes_list]
+    uploads = batches.get_uploads(note_events, uploader.supports_updates)
+    return batches.upload(uploader, self.queue, note_event_bytes_list, uploads)
+
+  def pending(self):
+    with journal.get_journal().locked():
+      return journal.get_journal().pending()
+
+  def test_uploads_whole_batch(self):
+    uploader = FakeUploader()
+    self.assertTrue(self.upload(uploader))
+    self.assertEqual(uploader.uploaded, ['a', 'b', 'c'])
+    self.assertEqual(self.queue.values, [])
+    self.assertEqual(self.pending(), [])
+
+  def test_commits_uploaded_prefix(self):
+    uploader = FakeUploader(fail_at='b')
+    self.assertFalse(self.upload(uploader))
+    # The placeholder before b was dropped rather than uploaded, so it is committed too.
+    self.assertEqual(self.queue.values, self.values[2:])
+    self.assertEqual(self.pending(), self.values[2:])
+
+    # The retry resumes from b.
+    uploader = FakeUploader()
+    self.assertTrue(self.upload(uploader))
+    self.assertEqual(uploader.uploaded, ['b', 'c'])
+    self.assertEqual(self.queue.values, [])
+
+  def test_commits_uploaded_prefix_when_upload_raises(self):
+    uploader = FakeUploader(fail_at='c', raise_error=True)
+    with self.assertRaises(RuntimeError):
+      self.upload(uploader)
+    self.assertEqual(self.queue.values, self.values[4:])
+    self.assertEqual(self.queue.index, 0)
+    self.assertEqual(self.pending(), self.values[4:])
+
+  def test_uploads_placeholders_when_supported(self):
+    uploader = FakeUploader(fail_at='', supports_updates=True)
+    self.assertFalse(self.upload(uploader))
+    self.assertEqual(uploader.uploaded, ['a', '[Transcribing]', 'b'])
+    self.assertEqual(self.queue.values, self.values[3:])
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -107,6 +107,7 @@ class Uploader:
         self.last_tweet_id = tweets[-1]['id_str']
       elif note_event.action == events.END_SESSION:
         self.end_session()
+      yield note_event
 
   def handle_inactivity(self):
     self._client = None